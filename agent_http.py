@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# CONFIG
+CONNECT_TIMEOUT = float(os.environ.get("AGENT_HTTP_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.environ.get("AGENT_HTTP_READ_TIMEOUT", 120))
+MAX_RETRIES = int(os.environ.get("AGENT_HTTP_RETRIES", 3))
+POOL_SIZE = int(os.environ.get("AGENT_HTTP_POOL_SIZE", 16))
+
+class AgentHTTPClient:
+    """
+    Shared HTTP client for agent-to-agent calls (Mission Control -> Strategist, Sentinel -> Strategist).
+    Keeps pooled keep-alive connections per host, always sets connect/read timeouts,
+    retries 5xx and connection failures with exponential backoff, and counts per-host latency.
+    """
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=MAX_RETRIES, backoff_factor=0.5, pool_size=POOL_SIZE):
+        self.timeout = (connect_timeout, read_timeout)
+        # read=0: a read timeout means the model may still be generating, so do not resend the prompt
+        retry = Retry(
+            total=retries, connect=retries, read=0, status=retries,
+            status_forcelist=(500, 502, 503, 504), allowed_methods=None,
+            backoff_factor=backoff_factor, raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.lock = threading.Lock()
+        self.latency = {}
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        ok = False
+        try:
+            resp = self.session.post(url, **kwargs)
+            ok = resp.status_code < 500
+            return resp
+        finally:
+            self._record(urlsplit(url).netloc, time.perf_counter() - start, ok)
+
+    def stream_lines(self, url, **kwargs):
+        """
+        POSTs with a streamed response and yields each JSON line as soon as it arrives
+        (chunked application/x-ndjson). The read timeout applies between chunks, not to the whole body.
+        The call counts as done (and is timed) at its terminal line ('done', or an untyped plain reply):
+        callers stop reading there, so the generator is usually closed before the body ends.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        elapsed = None
+        ok = False
+        try:
+            with self.session.post(url, stream=True, **kwargs) as resp:
+                resp.raise_for_status()
+                for raw in resp.iter_lines(decode_unicode=True):
+                    if not raw: continue
+                    event = json.loads(raw)
+                    if event.get("type") == "done" or ("type" not in event and "content" in event):
+                        ok, elapsed = True, time.perf_counter() - start
+                    yield event
+                ok = True
+        except requests.HTTPError as e:
+            ok = e.response is not None and e.response.status_code < 500 # As post(): a 4xx is not a host error
+            raise
+        finally:
+            if elapsed is None: elapsed = time.perf_counter() - start
+            self._record(urlsplit(url).netloc, elapsed, ok)
+
+    def _record(self, host, elapsed, ok):
+        with self.lock:
+            s = self.latency.setdefault(host, {"calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            s["calls"] += 1
+            s["errors"] += 0 if ok else 1
+            s["total_s"] += elapsed
+            s["max_s"] = max(s["max_s"], elapsed)
+
+    def latency_stats(self):
+        """Per-host counters: calls, errors, avg_s, max_s, total_s."""
+        with self.lock:
+            return {
+                host: dict(s, avg_s=(s["total_s"] / s["calls"]) if s["calls"] else 0.0)
+                for host, s in self.latency.items()
+            }
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide client, created on first use and reused across calls/invocations."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None: _client = AgentHTTPClient()
+    return _client
+
+def post(url, **kwargs):
+    return get_client().post(url, **kwargs)
+
+def stream_lines(url, **kwargs):
+    return get_client().stream_lines(url, **kwargs)
+
+def latency_stats():
+    return get_client().latency_stats()
@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+# CONFIG
+FINGERPRINT_PATH = os.environ.get("MC_FINGERPRINT_PATH", "mission_control.fingerprints.json")
+
+def analysis_fingerprint(budget_fingerprint, memory, token_budget=0):
+    """
+    Hash of everything the report prompt is built from: the project's Budget_Tracking rows
+    for the period (pre-hashed by BudgetSummary / BudgetIndex) and the previous-period learning.
+    """
+    memory = memory or {}
+    parts = [budget_fingerprint, repr(memory.get("prev_cpi")), memory.get("human_action") or "", str(token_budget or 0)]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+class FingerprintStore:
+    """
+    Input fingerprint of the last logged analysis per (Project ID, period), kept in a small JSON file.
+    A fingerprint only becomes current once its report row has reached AI_Analysis_Log (confirm),
+    so a crash never marks an unlogged analysis as up to date. force=True reports every unit as changed.
+    """
+    def __init__(self, path=FINGERPRINT_PATH, force=False):
+        self.path = path
+        self.force = force
+        self.lock = threading.Lock()
+        self.units = {}
+        self.pending = {}
+        self.skipped = 0
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f: self.units = json.load(f).get("units", {})
+            except (OSError, ValueError): self.units = {}
+
+    @staticmethod
+    def _key(pid, period):
+        return f"{pid}\0{period}"
+
+    def unchanged(self, pid, period, fingerprint):
+        """The stored entry when the last logged analysis was built from the same inputs, else None."""
+        if self.force: return None
+        with self.lock:
+            entry = self.units.get(self._key(pid, period))
+            if entry and entry["fingerprint"] == fingerprint:
+                self.skipped += 1
+                return entry
+        return None
+
+    def record(self, pid, period, fingerprint):
+        with self.lock:
+            self.pending[self._key(pid, period)] = {"fingerprint": fingerprint, "ts": time.time()}
+
+    def confirm(self, units):
+        """Promotes the pending fingerprints of (pid, period) units whose rows were flushed."""
+        with self.lock:
+            for pid, period in units:
+                entry = self.pending.pop(self._key(pid, period), None)
+                if entry: self.units[self._key(pid, period)] = entry
+
+    def save(self):
+        with self.lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f: json.dump({"units": self.units}, f)
+            os.replace(tmp, self.path)
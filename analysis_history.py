@@ -0,0 +1,61 @@
+import bisect
+
+class AnalysisHistory:
+    """
+    Per-run index over the AI_Analysis_Log rows, keyed by Project ID.
+    Each project's entries are sorted by Period so the previous-period lookup is a dict hit
+    (plus a bisect when the current period has never been logged).
+    """
+    def __init__(self, rows):
+        self.cols = {}
+        self.by_project = {}
+        self.positions = {}
+        if not rows or len(rows) < 2: return
+        self.cols = {h: i for i, h in enumerate(rows[0])}
+        if "Project ID" not in self.cols or "Period" not in self.cols: return
+
+        idx_id, idx_period = self.cols["Project ID"], self.cols["Period"]
+        latest = {}
+        for r_idx, r in enumerate(rows):
+            if r_idx == 0: continue
+            # Re-runs of the same period: the row appended last wins
+            latest[(r[idx_id], r[idx_period])] = (r_idx + 1, r)
+
+        for (pid, period), (sheet_row, r) in latest.items():
+            self.by_project.setdefault(pid, []).append((period, sheet_row, r))
+
+        for pid, entries in self.by_project.items():
+            entries.sort(key=lambda e: e[0])
+            self.positions[pid] = {e[0]: i for i, e in enumerate(entries)}
+
+    @classmethod
+    def from_sheet(cls, sh):
+        return cls(sh.worksheet("AI_Analysis_Log").get_all_values())
+
+    def latest(self, pid, period):
+        """Returns (sheet_row, row) of the last logged analysis for exactly this period, or None."""
+        entries = self.by_project.get(pid)
+        pos = self.positions[pid].get(period) if entries else None
+        if pos is None: return None
+        _, sheet_row, r = entries[pos]
+        return sheet_row, r
+
+    def has_row(self, row):
+        """True when row (a full AI_Analysis_Log row) is already the last one logged for its (pid, period)."""
+        if "Timestamp" not in self.cols or "AI Strategy" not in self.cols: return False
+        found = self.latest(row[self.cols["Project ID"]], row[self.cols["Period"]])
+        if found is None: return False
+        logged = found[1]
+        return all(str(logged[self.cols[c]]) == str(row[self.cols[c]]) for c in ("Timestamp", "AI Strategy"))
+
+    def previous(self, pid, current_period):
+        """Returns (sheet_row, row) for the latest period strictly before current_period, or None."""
+        entries = self.by_project.get(pid)
+        if not entries: return None
+
+        pos = self.positions[pid].get(current_period)
+        if pos is None:
+            pos = bisect.bisect_left(entries, current_period, key=lambda e: e[0])
+        if pos == 0: return None
+        _, sheet_row, r = entries[pos - 1]
+        return sheet_row, r
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import logging
+import time
+import random
+import argparse
+import importlib.util
+import tempfile
+import tracemalloc
+
+import project_metrics
+from prompt_engine import ExecutiveReportContext
+from analysis_history import AnalysisHistory
+from synthetic_portfolio import SyntheticPortfolio
+from schedule_engine import ScheduleIndex, format_day, parse_day
+from strategy_log import StrategyLog
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SCALES = "100x12x10,1000x12x20,2000x36x50"   # projects x periods x cost categories
+
+class MockLLM:
+    """Stand-in for the model endpoint: fixed-size answer after an optional simulated latency."""
+    def __init__(self, latency_s=0.0, tokens=300, seed=0):
+        self.latency_s = latency_s
+        self.tokens = tokens
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def __call__(self, prompt):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency_s: time.sleep(self.latency_s)
+        return " ".join(self.rng.choice(("cost", "crew", "steel", "freeze", "plan")) for _ in range(self.tokens))
+
+def load_sentinel():
+    """Imports src/sentinel/main.py by path (it shares its module name with the Strategist)."""
+    sys.path.insert(0, os.path.join(ROOT, "src", "sentinel"))
+    os.environ.setdefault("METRICS_PORT", "0") # No side /metrics server inside the benchmark
+    spec = importlib.util.spec_from_file_location("sentinel_main", os.path.join(ROOT, "src", "sentinel", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Per-row INFO lines would dominate the timings
+    logging.getLogger().setLevel(logging.WARNING)
+    return module
+
+class ListWorksheet:
+    """Minimal in-memory worksheet for the Sentinel scan (it only reads get_all_values)."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_all_values(self):
+        return self.rows
+
+class Stages:
+    """Times each stage and records its peak traced memory."""
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.results = {}
+
+    def run(self, name, fn):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        peak = (tracemalloc.get_traced_memory()[1] - base) if self.track_memory else 0
+        self.results[name] = {"seconds": elapsed, "peak_mb": peak / 2**20}
+        return out
+
+def bench_scale(projects, periods, categories, seed=42, llm_latency=0.0, track_memory=True):
+    portfolio = SyntheticPortfolio(projects, periods, categories, seed=seed)
+    llm = MockLLM(latency_s=llm_latency, seed=seed)
+    st = Stages(track_memory)
+
+    budget_rows = st.run("generate", lambda: list(portfolio.iter_budget_rows()))
+    log_rows = list(portfolio.iter_log_rows())
+    gantt_rows = list(portfolio.iter_gantt_rows())
+
+    index = st.run("budget_index", lambda: project_metrics.BudgetIndex(budget_rows))
+    active = project_metrics.get_active_projects(index)
+    metrics = st.run("metrics_scalar", lambda: {
+        pid: project_metrics.calculate_financials(index, pid, info['latest_period']) for pid, info in active.items()
+    })
+    st.run("metrics_batch", lambda: project_metrics.calculate_portfolio_financials(budget_rows))
+    history = st.run("history_index", lambda: AnalysisHistory(log_rows))
+
+    g = {h: i for i, h in enumerate(gantt_rows[0])}
+    starts = [r[g["Forecast Start"]] for r in gantt_rows[1:]]
+    ends = [r[g["Baseline End"]] for r in gantt_rows[1:]]
+    spis = [metrics.get(r[g["Project ID"]], {}).get("spi", 1.0) for r in gantt_rows[1:]]
+    st.run("forecast_scalar", lambda: [project_metrics.calculate_ai_forecast(s, e, x) for s, e, x in zip(starts, ends, spis)])
+    st.run("forecast_bulk", lambda: project_metrics.calculate_ai_forecasts(starts, ends, spis))
+
+    schedules = st.run("cpm_build", lambda: ScheduleIndex(gantt_rows))
+    # One task slips by a week: only its project is diffed, and only the downstream tasks move
+    slipped = [list(r) for r in gantt_rows]
+    r = slipped[1]
+    r[g["Forecast End"]] = format_day(parse_day(r[g["Forecast End"]]) + 7)
+    st.run("cpm_slip_refresh", lambda: schedules.refresh(slipped))
+
+    def render_all():
+        prompts = []
+        for pid, info in active.items():
+            found = history.previous(pid, info['latest_period'])
+            m = metrics[pid]
+            prompts.append(ExecutiveReportContext(
+                project_name=info['name'], cpi=m['cpi'], variance=m['variance'],
+                bleeding_items=m['root_causes'], data_sources=["1. Budget Data: FOUND"],
+                prev_action=found[1][history.cols["Actual Action Taken"]] if found else None,
+                prev_result="SYNTHETIC" if found else None
+            ).render())
+        return prompts
+    prompts = st.run("prompt_render", render_all)
+    answers = st.run("llm_mock", lambda: [llm(p) for p in prompts])
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = StrategyLog(log_dir, segment_bytes=256 * 1024) # Small segments so the run rotates
+        st.run("log_append", lambda: [log.append(pid, active[pid]['latest_period'], a, metrics[pid]['cpi'])
+                                      for pid, a in zip(active, answers)])
+        st.run("log_last", lambda: [log.last(pid, 3)[0].strategy for pid in active])
+        log.close()
+
+    sentinel = load_sentinel()
+    sentinel._worksheet = ListWorksheet(budget_rows)
+    sentinel._scan_state.update(last_update=None, sheet_fingerprint=None, headers=None, rows={}, result=[])
+    breaches = st.run("sentinel_scan", sentinel.scan_breaches)
+    st.run("sentinel_rescan", sentinel.scan_breaches) # Unchanged sheet: fingerprint fast path
+
+    return {
+        "scale": f"{projects}x{periods}x{categories}",
+        "rows": len(budget_rows) - 1,
+        "active_projects": len(active),
+        "breaches": len(breaches),
+        "prompt_chars": llm.prompt_chars,
+        "stages": st.results,
+    }
+
+def compare(results, baseline, tolerance):
+    """Returns the list of (scale, stage, old_s, new_s) that got slower than the tolerance allows."""
+    old = {r["scale"]: r["stages"] for r in baseline}
+    slower = []
+    for r in results:
+        for stage, s in r["stages"].items():
+            prev = old.get(r["scale"], {}).get(stage)
+            if prev and prev["seconds"] > 0.001 and s["seconds"] > prev["seconds"] * (1 + tolerance):
+                slower.append((r["scale"], stage, prev["seconds"], s["seconds"]))
+    return slower
+
+def print_report(results):
+    for r in results:
+        print(f"\n📊 {r['scale']}  ({r['rows']:,} budget rows, {r['active_projects']:,} active projects, "
+              f"{r['breaches']:,} breaches, {r['prompt_chars']:,} prompt chars)")
+        print(f"   {'stage':<16}{'time (s)':>12}{'peak (MB)':>12}")
+        for stage, s in r["stages"].items():
+            print(f"   {stage:<16}{s['seconds']:>12.4f}{s['peak_mb']:>12.1f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Metrics / prompt / Sentinel micro-benchmarks on synthetic portfolios.")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated PROJECTSxPERIODSxCATEGORIES")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per mock LLM call")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (faster, no peak memory)")
+    parser.add_argument("--save", help="Write results as JSON (use as a later --baseline)")
+    parser.add_argument("--baseline", help="Previous --save output; exit 1 if any stage regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    if not args.no_memory: tracemalloc.start()
+    results = []
+    for scale in args.scales.split(","):
+        projects, periods, categories = (int(x) for x in scale.lower().split("x"))
+        print(f"⏱️  Benchmarking {scale}...")
+        results.append(bench_scale(projects, periods, categories, args.seed, args.llm_latency, not args.no_memory))
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f: json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f: slower = compare(results, json.load(f), args.tolerance)
+        if slower:
+            print(f"\n❌ {len(slower)} stage(s) regressed beyond {args.tolerance:.0%}:")
+            for scale, stage, old_s, new_s in slower: print(f"   - {scale} {stage}: {old_s:.4f}s -> {new_s:.4f}s")
+            return 1
+        print("\n✅ No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
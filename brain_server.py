@@ -1,46 +1,128 @@
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
+import threading
 import google.generativeai as genai
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request
+import stage_metrics
 
 # CONFIG
 HOST_NAME = "0.0.0.0" # Listen on all interfaces for Docker
 SERVER_PORT = 8081
 CREDENTIALS_FILE = "credentials.json"
+MODEL_NAME = os.environ.get("BRAIN_MODEL", "gemini-2.5-flash")
+WORKERS = int(os.environ.get("BRAIN_WORKERS", 16))                 # Concurrent connections served
+KEEPALIVE_TIMEOUT = float(os.environ.get("BRAIN_KEEPALIVE", 15))    # Idle keep-alive connections are released after this
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
 
-class BrainHandler(BaseHTTPRequestHandler):
-    def do_POST(self):
+class BrainState:
+    """
+    Credentials + model client, built ONCE at startup and shared by every request.
+    The access token is refreshed only when it has expired.
+    """
+    def __init__(self):
+        self.creds = None
+        self.model = None
+        self.error = None
+        self.lock = threading.Lock()
+
+    def load(self):
         try:
-            # 1. SETUP AUTH (The Official Way)
-            creds = service_account.Credentials.from_service_account_file(CREDENTIALS_FILE)
-            
-            # Configure the library with your credentials
-            # Note: The library usually looks for API_KEY, but with Vertex/Enterprise
-            # we configure it via Google Cloud directly. 
-            # For simplicity in this specific library version, we stick to the 
-            # REST method IF using Service Accounts, OR use the API Key method.
-            
-            # ... [Wait] ...
-            # Actually, for PURE Service Account usage without an API Key, 
-            # the REST method I gave you previously is STILL the most robust 
-            # "No-Magic" way. The official library is optimized for API Keys.
-            
-            # LET'S STICK TO THE REST API VERSION FOR STABILITY 
-            # UNLESS YOU HAVE A "VERTEX AI" ENDPOINT SET UP.
-            
-            # (Keeping your current brain_server.py is perfectly fine and standard).
-            
+            self.creds = service_account.Credentials.from_service_account_file(CREDENTIALS_FILE, scopes=SCOPES)
+            genai.configure(credentials=self.creds)
+            self.model = genai.GenerativeModel(MODEL_NAME)
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+
+    def ensure_fresh(self):
+        if self.creds is None: raise RuntimeError(f"Credentials not loaded: {self.error}")
+        if self.creds.valid: return
+        with self.lock:
+            if not self.creds.valid: self.creds.refresh(Request())
+
+    def ready(self):
+        return self.creds is not None and self.model is not None
+
+state = BrainState()
+
+class BrainHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive: mission_control's pooled client reuses connections
+    timeout = KEEPALIVE_TIMEOUT
+
+    def send_json(self, status, body):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            data = stage_metrics.registry.render_prometheus().encode("utf-8")
             self.send_response(200)
+            self.send_header("Content-Type", stage_metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(data)))
             self.end_headers()
-            self.wfile.write(b'{"content": "Brain is running on Python 3.11!"}')
+            self.wfile.write(data)
+        # Readiness probe
+        elif self.path in ("/ready", "/healthz"):
+            if state.ready(): self.send_json(200, {"status": "ready", "model": MODEL_NAME})
+            else: self.send_json(503, {"status": "not ready", "error": state.error})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        with stage_metrics.span("request"):
+            self.handle_post()
+
+    def handle_post(self):
+        try:
+            # Always drain the body, otherwise the next request on this connection is corrupted
+            length = int(self.headers.get("Content-Length", 0))
+            if length: self.rfile.read(length)
+            if self.path.split("?")[0] != "/":
+                self.send_json(404, {"error": "not found"}) # e.g. /stream: clients fall back to POST /
+                return
+
+            # 1. AUTH (loaded at startup, refreshed only on expiry)
+            with stage_metrics.span("auth"): state.ensure_fresh()
+
+            # Note: for PURE Service Account usage the REST method is still the most robust
+            # "No-Magic" route; the model client above is ready for when a Vertex endpoint is set up.
+            self.send_json(200, b'{"content": "Brain is running on Python 3.11!"}')
 
         except Exception as e:
-            self.send_response(500)
-            self.end_headers()
-            self.wfile.write(str(e).encode('utf-8'))
+            stage_metrics.inc("errors_total", stage="request")
+            self.send_json(500, {"error": str(e)})
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that serves each connection on a bounded thread pool."""
+    def __init__(self, server_address, handler_class, workers=WORKERS):
+        super().__init__(server_address, handler_class)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
 
 if __name__ == "__main__":
-    print(f"🧠 ENTERPRISE BRAIN (Python 3.11) STARTED on port {SERVER_PORT}")
-    server = HTTPServer((HOST_NAME, SERVER_PORT), BrainHandler)
-    server.serve_forever()
\ No newline at end of file
+    state.load()
+    print(f"🧠 ENTERPRISE BRAIN (Python 3.11) STARTED on port {SERVER_PORT} ({WORKERS} workers, ready={state.ready()})")
+    if state.error: print(f"⚠️  Startup auth error: {state.error}")
+    server = PooledHTTPServer((HOST_NAME, SERVER_PORT), BrainHandler)
+    server.serve_forever()
@@ -0,0 +1,125 @@
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+
+DATE_FORMATS = ("%Y-%m-%d", "%b-%d", "%d-%b-%Y", "%Y-%m")
+
+CellError = namedtuple("CellError", ["column", "row", "value"])  # row = 0-based position in the column
+
+class DecodedColumn:
+    """
+    Typed values for one column (NaN / NaT where a cell could not be decoded) plus those bad cells.
+    A literal "nan" cell is a number, as in clean_currency: it stays NaN and is not an error.
+    """
+    def __init__(self, values, errors):
+        self.values = values
+        self.errors = errors
+
+    def filled(self, fill):
+        """Values with undecodable cells replaced, e.g. filled(0.0) for the legacy currency semantics."""
+        if not self.errors: return self.values
+        out = self.values.copy()
+        out[[e.row for e in self.errors]] = fill
+        return out
+
+def _clean(raw):
+    return str(raw).replace("$", "").replace(",", "").strip()
+
+def _parse(text):
+    """float, 0.0 for a blank cell, or None for text that is not a number."""
+    try: return float(text) if text else 0.0
+    except ValueError: return None
+
+class CurrencyDecoder:
+    """
+    Cell-at-a-time currency parsing for streaming readers.
+    Repeated strings are parsed once; blank cells are 0.0; text that is not a number is
+    recorded in `errors` (and counts as 0.0) instead of disappearing silently.
+    """
+    def __init__(self, max_cache=65536):
+        self.max_cache = max_cache
+        self.cache = {}
+        self.errors = []
+
+    def __call__(self, raw, column="", row=None):
+        if raw in self.cache: value = self.cache[raw]
+        else:
+            value = _parse(_clean(raw))
+            if len(self.cache) < self.max_cache: self.cache[raw] = value
+        if value is None:
+            self.errors.append(CellError(column, row, raw))
+            return 0.0
+        return value
+
+def decode_currency(values, column=""):
+    """Decodes a whole column of "$1,234"-style cells into a float64 array in one go."""
+    try:
+        # Fast path: strip the junk from the whole column in ONE string pass and let numpy parse the lot
+        cleaned = "\x1f".join(values).replace("$", "").replace(",", "").split("\x1f")
+        if len(cleaned) == len(values): return DecodedColumn(np.array(cleaned, dtype=np.float64), [])
+    except (TypeError, ValueError):
+        pass
+
+    cleaned = [_clean(v) for v in values]
+    out = np.empty(len(cleaned), dtype=np.float64)
+    errors = []
+    cache = {}
+    for i, text in enumerate(cleaned):
+        if text not in cache: cache[text] = _parse(text)
+        value = cache[text]
+        if value is None:
+            errors.append(CellError(column, i, values[i]))
+            value = float("nan")
+        out[i] = value
+    return DecodedColumn(out, errors)
+
+def _try_format(text, fmt):
+    try: return datetime.strptime(text, fmt)
+    except ValueError: return None
+
+def infer_date_format(values, sample_size=50, formats=DATE_FORMATS):
+    """The format that parses most of a sample of non-blank cells (earlier formats win ties), or None."""
+    sample = []
+    for v in values:
+        if v: sample.append(v)
+        if len(sample) >= sample_size: break
+    if not sample: return None
+    best, best_hits = None, 0
+    for fmt in formats:
+        hits = sum(1 for v in sample if _try_format(v, fmt))
+        if hits > best_hits: best, best_hits = fmt, hits
+    return best
+
+def decode_dates(values, fmt=None, column=""):
+    """
+    Decodes a whole column of date strings into datetime64[D] (NaT for blank or bad cells).
+    The format is inferred ONCE from a sample; cells that do not match it fall back to the
+    other known formats, and cells matching none are reported in `errors`.
+    """
+    fmt = fmt or infer_date_format(values)
+    values = list(values)
+    if fmt == "%Y-%m-%d":
+        try:
+            # Fast path: numpy parses ISO days natively; reject anything coarser it would also accept
+            if all(len(v) == 10 or not v for v in values):
+                return DecodedColumn(np.array([v or "NaT" for v in values], dtype="datetime64[D]"), [])
+        except ValueError:
+            pass
+
+    fallbacks = [f for f in DATE_FORMATS if f != fmt]
+    out = np.empty(len(values), dtype="datetime64[D]")
+    errors = []
+    cache = {}
+    for i, text in enumerate(values):
+        if text in cache:
+            value = cache[text]
+        else:
+            parsed = None
+            if text:
+                parsed = (_try_format(text, fmt) if fmt else None) or next(
+                    (p for p in (_try_format(text, f) for f in fallbacks) if p), None
+                )
+            value = cache[text] = np.datetime64(parsed.date(), "D") if parsed else np.datetime64("NaT")
+        if text and np.isnat(value): errors.append(CellError(column, i, text))
+        out[i] = value
+    return DecodedColumn(out, errors)
@@ -0,0 +1,249 @@
+import os
+import re
+import csv
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+# CONFIG
+DATA_STORE = os.environ.get("MC_DATA_STORE", "sheets")                    # "sheets" or "sqlite"
+SQLITE_PATH = os.environ.get("MC_SQLITE_PATH", "mission_control.sqlite3")
+SPREADSHEET_NAME = "Mission Control Log"
+JSON_KEYFILE = "credentials.json"
+PAGE_ROWS = int(os.environ.get("MC_PAGE_ROWS", 5000))                    # Rows per read when streaming a tab
+SHEETS_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# Column layout of every tab the agents read or write
+TAB_HEADERS = {
+    "Budget_Tracking": [
+        "Project ID", "Project Name", "Status", "Report Period", "Cost Category",
+        "Budget (BAC)", "Planned Value (PV)", "Earned Value (EV)", "Actual Cost (AC)", "CPI (EV/AC)"
+    ],
+    "Schedule_Gantt": [
+        "Project ID", "Report Period", "Task ID", "Task Name", "Status",
+        "Baseline Start", "Baseline End", "Forecast Start", "Forecast End",
+        "Critical?", "Dependency"
+    ],
+    "AI_Analysis_Log": [
+        "Timestamp", "Project ID", "Project Name", "Period", "CPI",
+        "AI Strategy", "Actual Action Taken"
+    ],
+}
+
+class WorksheetNotFound(KeyError):
+    pass
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _a1_to_rowcol(label):
+    m = re.match(r"^([A-Za-z]+)(\d+)", label)
+    if not m: raise ValueError(f"Unsupported range: {label}")
+    col = 0
+    for ch in m.group(1).upper(): col = col * 26 + ord(ch) - 64
+    return int(m.group(2)), col
+
+def _cell(value):
+    # Stored as displayed text, like get_all_values() returns it (1.0 -> "1")
+    if value is None: return ""
+    if isinstance(value, float) and value.is_integer(): return str(int(value))
+    return str(value)
+
+class SQLiteWorksheet:
+    """
+    One tab of a SQLiteStore, exposing the gspread Worksheet calls the agents use
+    (get_all_values, append_row(s), update_cell, batch_update, update, clear).
+    Row 1 is the header (the table's column names); data rows are keyed by row_num = sheet row - 1.
+    """
+    def __init__(self, store, title):
+        self.store = store
+        self.spreadsheet = store
+        self.title = title
+        self.table = _quote(title)
+
+    def headers(self):
+        cols = self.store.db.execute(f"PRAGMA table_info({self.table})").fetchall()
+        return [c[1] for c in cols if c[1] != "row_num"]
+
+    def get_all_values(self):
+        with self.store.lock:
+            headers = self.headers()
+            if not headers: return []
+            select = ", ".join(_quote(h) for h in headers)
+            rows = self.store.db.execute(f"SELECT {select} FROM {self.table} ORDER BY row_num").fetchall()
+        return [headers] + [[_cell(v) for v in r] for r in rows]
+
+    def iter_rows(self, page_size=PAGE_ROWS):
+        """Header row, then data rows fetched page by page (keyset pagination on row_num)."""
+        with self.store.lock:
+            headers = self.headers()
+        if not headers: return
+        yield headers
+        select = ", ".join(_quote(h) for h in headers)
+        last = 0
+        while True:
+            with self.store.lock:
+                page = self.store.db.execute(
+                    f"SELECT row_num, {select} FROM {self.table} WHERE row_num > ? ORDER BY row_num LIMIT ?",
+                    (last, page_size)
+                ).fetchall()
+            if not page: return
+            for r in page: yield [_cell(v) for v in r[1:]]
+            last = page[-1][0]
+
+    def _ensure_columns(self, width):
+        headers = self.headers()
+        for i in range(len(headers), width):
+            self.store.db.execute(f"ALTER TABLE {self.table} ADD COLUMN {_quote(f'Column {i + 1}')} TEXT")
+        return self.headers()
+
+    def append_row(self, values):
+        self.append_rows([values])
+
+    def append_rows(self, rows):
+        if not rows: return
+        with self.store.lock:
+            headers = self._ensure_columns(max(len(r) for r in rows))
+            start = self.store.db.execute(f"SELECT COALESCE(MAX(row_num), 0) FROM {self.table}").fetchone()[0]
+            cols = ", ".join(["row_num"] + [_quote(h) for h in headers])
+            marks = ", ".join("?" * (len(headers) + 1))
+            self.store.db.executemany(
+                f"INSERT INTO {self.table} ({cols}) VALUES ({marks})",
+                [[start + i + 1] + [_cell(v) for v in r] + [""] * (len(headers) - len(r)) for i, r in enumerate(rows)]
+            )
+            self.store.touch()
+
+    def _set_cell(self, row, col, value):
+        if row < 2: raise ValueError("Header cells are defined by update('A1', ...)")
+        headers = self._ensure_columns(col)
+        name = _quote(headers[col - 1])
+        cur = self.store.db.execute(f"UPDATE {self.table} SET {name} = ? WHERE row_num = ?", (_cell(value), row - 1))
+        if cur.rowcount == 0:
+            self.store.db.execute(f"INSERT INTO {self.table} (row_num, {name}) VALUES (?, ?)", (row - 1, _cell(value)))
+
+    def update_cell(self, row, col, value):
+        with self.store.lock:
+            self._set_cell(row, col, value)
+            self.store.touch()
+
+    def batch_update(self, data, raw=True):
+        with self.store.lock:
+            for item in data:
+                row, col = _a1_to_rowcol(item["range"])
+                for dr, values in enumerate(item["values"]):
+                    for dc, value in enumerate(values): self._set_cell(row + dr, col + dc, value)
+            self.store.touch()
+
+    def update(self, range_name, values=None):
+        """update("A1", rows) rewrites the whole tab with rows[0] as the header; other anchors write cells."""
+        if not isinstance(range_name, str): range_name, values = values, range_name
+        row, col = _a1_to_rowcol(range_name)
+        with self.store.lock:
+            if (row, col) == (1, 1) and values:
+                self.store.create_table(self.title, values[0])
+                self.append_rows(values[1:])
+            else:
+                self.batch_update([{"range": range_name, "values": values}])
+
+    def clear(self):
+        with self.store.lock:
+            self.store.create_table(self.title, [])
+
+    # Presentation-only calls are no-ops locally
+    def format(self, *args, **kwargs):
+        pass
+
+    def set_column_width(self, *args, **kwargs):
+        pass
+
+class SQLiteStore:
+    """
+    Local, offline stand-in for the Google Spreadsheet: one SQLite table per tab, keyed by row_num
+    (every reader streams whole tabs in row order). Exposes worksheet()/add_worksheet()
+    like gspread's Spreadsheet, so existing readers and writers work against either backend.
+    """
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS _store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.commit()
+
+    def tables(self):
+        rows = self.db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\'").fetchall()
+        return [r[0] for r in rows]
+
+    def worksheet(self, title):
+        with self.lock:
+            if title not in self.tables(): raise WorksheetNotFound(title)
+        return SQLiteWorksheet(self, title)
+
+    def add_worksheet(self, title, rows=None, cols=None):
+        with self.lock:
+            if title not in self.tables(): self.create_table(title, TAB_HEADERS.get(title, []))
+        return SQLiteWorksheet(self, title)
+
+    def create_table(self, title, headers):
+        """(Re)creates a tab with the given header row."""
+        table = _quote(title)
+        cols = ", ".join(["row_num INTEGER PRIMARY KEY"] + [f"{_quote(h)} TEXT" for h in headers])
+        with self.lock:
+            self.db.execute(f"DROP TABLE IF EXISTS {table}")
+            self.db.execute(f"CREATE TABLE {table} ({cols})")
+            self.touch()
+
+    def touch(self):
+        """Records a write; get_lastUpdateTime() lets readers skip unchanged stores (like Drive's modifiedTime)."""
+        now = datetime.now(timezone.utc).isoformat()
+        self.db.execute("INSERT OR REPLACE INTO _store_meta (key, value) VALUES ('last_update', ?)", (now,))
+        self.db.commit()
+
+    def get_lastUpdateTime(self):
+        row = self.db.execute("SELECT value FROM _store_meta WHERE key = 'last_update'").fetchone()
+        return row[0] if row else None
+
+def iter_rows(worksheet, page_size=PAGE_ROWS):
+    """
+    Streams a tab as rows (header first) without materializing it: SQLite tabs page by row_num,
+    gspread worksheets are read page_size rows per API call up to the grid's row_count.
+    The API drops trailing blank rows from each page, so a short page is not the end of the tab:
+    the missing blank rows are put back (as get_all_values has them) once more data follows.
+    """
+    if hasattr(worksheet, "iter_rows"):
+        yield from worksheet.iter_rows(page_size)
+        return
+    start, total = 1, worksheet.row_count
+    width, blanks = 0, 0
+    while start <= total:
+        end = min(start + page_size - 1, total)
+        page = worksheet.get_values(f"{start}:{end}")
+        if page:
+            width = width or len(page[0])
+            for _ in range(blanks): yield [""] * width
+            yield from page
+            blanks = 0
+        blanks += (end - start + 1) - len(page)
+        start = end + 1
+
+def iter_csv_rows(path, encoding="utf-8"):
+    """Streams a CSV export (e.g. a multi-year Budget_Tracking dump) row by row."""
+    with open(path, newline="", encoding=encoding) as f:
+        yield from csv.reader(f)
+
+def open_sheets(name=SPREADSHEET_NAME, keyfile=JSON_KEYFILE):
+    """The Google Sheets backend: an authorized gspread Spreadsheet."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+    creds = Credentials.from_service_account_file(keyfile, scopes=SHEETS_SCOPES)
+    return gspread.authorize(creds).open(name)
+
+def open_store(backend=None, name=SPREADSHEET_NAME, path=None):
+    """Returns a Spreadsheet-like store for MC_DATA_STORE ("sheets" or "sqlite")."""
+    backend = backend or DATA_STORE
+    if backend == "sqlite": return SQLiteStore(path or SQLITE_PATH)
+    if backend == "sheets": return open_sheets(name)
+    raise ValueError(f"Unknown data store: {backend}")
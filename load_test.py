@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import make_server
+
+import data_store
+import stage_metrics
+from benchmark import compare, load_sentinel
+from mock_llm import MockGenerativeModel
+from synthetic_portfolio import SyntheticPortfolio
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TARGETS = ("sentinel", "strategist")
+QUANTILES = (0.5, 0.95, 0.99)
+
+def load_strategist(log_dir):
+    """Imports src/strategist/main.py by path, with the disk cache off and the strategy log under log_dir."""
+    sys.path.insert(0, os.path.join(ROOT, "src", "strategist"))
+    os.environ["STRATEGY_CACHE_PATH"] = "" # Memory tier only: no state carried over between runs
+    os.environ["STRATEGY_LOG_DIR"] = log_dir
+    spec = importlib.util.spec_from_file_location("strategist_main", os.path.join(ROOT, "src", "strategist", "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def seed_store(path, projects, seed):
+    """Offline store for both services, in the production tab layout (data_store.TAB_HEADERS)."""
+    store = data_store.SQLiteStore(path)
+    SyntheticPortfolio(projects, 3, 5, seed=seed).seed_store(store)
+    return store
+
+class SheetEditor:
+    """
+    The sheet edit behind each event: a random row gets a new lowest CPI, so every event
+    carries a different worst breach (and prompt) instead of being answered from cache.
+    """
+    def __init__(self, worksheet, seed):
+        rows = worksheet.get_all_values()
+        self.worksheet = worksheet
+        self.col = rows[0].index("CPI (EV/AC)") + 1
+        cpis = []
+        for r in rows[1:]:
+            try: cpis.append(float(r[self.col - 1]))
+            except ValueError: continue
+        self.next_cpi = min(cpis, default=1.0) - 0.01
+        self.rows = len(rows)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def edit(self):
+        with self.lock:
+            row, value = self.rng.randint(2, self.rows), round(self.next_cpi, 6)
+            self.next_cpi -= 1e-5
+        self.worksheet.update_cell(row, self.col, value)
+        return value
+
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def run_load(fire, events, rate, concurrency):
+    """
+    Open loop: event i is due at i / rate seconds (rate 0 = all at once) whether or not earlier
+    events have finished; at most `concurrency` run at a time. Latency is measured from the due
+    time, so waiting behind a saturated pipeline counts (no coordinated omission).
+    Returns ([(due, start, end, ok)], wall seconds).
+    """
+    samples = [None] * events
+    def one(i, due):
+        start = time.perf_counter()
+        try: ok = fire(i)
+        except Exception as e:
+            logging.error(f"Event {i} failed: {e}")
+            ok = False
+        samples[i] = (due, start, time.perf_counter(), ok)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+        for i in range(events):
+            due = t0 + (i / rate if rate > 0 else 0.0)
+            delay = due - time.perf_counter()
+            if delay > 0: time.sleep(delay)
+            pool.submit(one, i, due)
+    return samples, time.perf_counter() - t0
+
+def summarize(name, samples, wall):
+    ok = [s for s in samples if s[3]]
+    latency = [end - due for due, _, end, _ in samples]
+    service = [end - start for _, start, end, _ in samples]
+    stages = {}
+    for q in QUANTILES:
+        stages[f"latency_p{int(q * 100)}"] = {"seconds": percentile(latency, q), "peak_mb": 0.0}
+    for q in QUANTILES:
+        stages[f"service_p{int(q * 100)}"] = {"seconds": percentile(service, q), "peak_mb": 0.0}
+    stages["latency_max"] = {"seconds": max(latency, default=0.0), "peak_mb": 0.0}
+    return {"scale": name, "events": len(samples), "ok": len(ok), "wall_s": wall,
+            "throughput": len(ok) / wall if wall else 0.0, "stages": stages}
+
+def print_report(result, model, statuses, offered):
+    print(f"\n🚀 {result['scale']}")
+    print(f"   events ok / failed   {result['ok']} / {result['events'] - result['ok']}")
+    print(f"   wall time            {result['wall_s']:.2f}s")
+    print(f"   throughput           {result['throughput']:.1f} events/s" + (f" (offered {offered:g}/s)" if offered else ""))
+    print(f"   {'':<21}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    s = result["stages"]
+    print(f"   {'latency (from due)':<21}" + "".join(f"{s[k]['seconds']:>8.3f}" for k in ("latency_p50", "latency_p95", "latency_p99", "latency_max")))
+    print(f"   {'service (from start)':<21}" + "".join(f"{s[k]['seconds']:>8.3f}" for k in ("service_p50", "service_p95", "service_p99")))
+    m = model.stats()
+    print(f"   model calls          {m['calls']} ({m['errors']} failed, max {m['max_in_flight']} in flight, {m['output_tokens']:,} output tokens)")
+    codes = {}
+    for code in statuses: codes[code] = codes.get(code, 0) + 1
+    print(f"   strategist requests  {len(statuses)} " + " ".join(f"[{c}: {n}]" for c, n in sorted(codes.items())))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test: synthetic events through the real Sentinel and Strategist code paths, against a mock model.")
+    parser.add_argument("--target", choices=TARGETS, default="sentinel",
+                        help="sentinel: cloud events into analyze_event (which POSTs to the Strategist); strategist: alerts POSTed straight to it")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=10.0, help="Events per second (0 = all at once)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Events in flight at most (Sentinel instances / clients)")
+    parser.add_argument("--projects", type=int, default=200, help="Synthetic portfolio size")
+    parser.add_argument("--repeat", type=float, default=0.0, help="Share of events re-sending an unchanged alert (cache / coalescing path)")
+    parser.add_argument("--latency", default="lognormal:0.8,0.5", help="Model time to first token: SECONDS, uniform:A,B, normal:M,SD, lognormal:MEDIAN,SIGMA, exponential:MEAN")
+    parser.add_argument("--output-tokens", default="uniform:150,400", help="Tokens per answer (same distribution syntax)")
+    parser.add_argument("--tokens-per-s", type=float, default=80.0, help="Model decode speed per call (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of model calls that fail")
+    parser.add_argument("--model-concurrency", type=int, default=0, help="Model calls in flight before they queue (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Keep the services' per-event logging")
+    parser.add_argument("--save", help="Write results as JSON (use as a later --baseline)")
+    parser.add_argument("--baseline", help="Previous --save output; exit 1 if any latency regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"🌱 Seeding {args.projects} synthetic projects...")
+        store = seed_store(os.path.join(workdir, "load.sqlite3"), args.projects, args.seed)
+
+        # Real Strategist (Flask app on a threaded HTTP server); only the model endpoint is simulated
+        strategist = load_strategist(os.path.join(workdir, "strategy_log"))
+        strategist._schedule_state["worksheet"] = store.worksheet(strategist.SCHEDULE_TAB)
+        model = strategist._model = MockGenerativeModel(args.latency, args.output_tokens, args.tokens_per_s,
+                                                        args.error_rate, args.model_concurrency, args.seed)
+        statuses = []   # Every response, retries included
+        final_status = {} # event_id -> status of its last attempt (a /batch with failed items counts as 500)
+        @strategist.app.after_request
+        def count_status(response):
+            statuses.append(response.status_code)
+            body = strategist.request.get_json(silent=True)
+            alerts = body if isinstance(body, list) else [body or {}]
+            event_id = alerts[0].get("event_id") if alerts and isinstance(alerts[0], dict) else None
+            status = response.status_code
+            if status == 200 and isinstance(body, list) and any("error" in r for r in response.get_json()): status = 500
+            if event_id: final_status[event_id] = status
+            return response
+        server = make_server("127.0.0.1", 0, strategist.app, threaded=True)
+        threading.Thread(target=server.serve_forever, name="strategist", daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+
+        import agent_http # Pooled like production, sized so the harness itself is not the bottleneck
+        agent_http._client = agent_http.AgentHTTPClient(pool_size=max(agent_http.POOL_SIZE, args.concurrency))
+
+        rng = random.Random(args.seed)
+        repeats = [i > 0 and rng.random() < args.repeat for i in range(args.events)]
+        editor = SheetEditor(store.worksheet("Budget_Tracking"), args.seed)
+        if args.target == "sentinel":
+            os.environ["STRATEGIST_URL"] = url
+            sentinel = load_sentinel()
+            sentinel.PROJECT_ID = "local-test" # Always the direct HTTP path, never Pub/Sub
+            sentinel._worksheet = store.worksheet(sentinel.TAB_NAME)
+            def fire(i):
+                if not repeats[i]: editor.edit()
+                sentinel.analyze_event({"id": f"load-{i}", "source": "load_test", "type": "google.cloud.pubsub.topic.v1.messagePublished"})
+                return final_status.get(f"load-{i}") == 200
+        else:
+            project_ids = sorted({r[0] for r in store.worksheet(strategist.SCHEDULE_TAB).get_all_values()[1:]})
+            alerts = []
+            for i in range(args.events): # A repeat re-sends the previous alert's content
+                if not repeats[i]:
+                    pid, cpi = rng.choice(project_ids), round(0.85 - i * 1e-5, 6)
+                alerts.append({"event_id": f"load-{i}", "alert_type": "CPI_BREACH", "project_id": pid,
+                               "details": {"current_value": cpi, "threshold": 0.9}})
+            def fire(i):
+                return agent_http.post(url, json=alerts[i]).status_code == 200
+
+        if not args.verbose:
+            logging.disable(logging.CRITICAL)
+        print(f"🔥 Firing {args.events} events at {args.rate:g}/s into the {args.target} (concurrency {args.concurrency})...")
+        stage_metrics.registry = stage_metrics.MetricsRegistry() # Stage timings of the run only
+        samples, wall = run_load(fire, args.events, args.rate, args.concurrency)
+        logging.disable(logging.NOTSET)
+        server.shutdown()
+        if strategist.strategy_log: strategist.strategy_log.close()
+
+    name = f"{args.target} {args.events}@{args.rate:g}/s c{args.concurrency}"
+    result = summarize(name, samples, wall)
+    print_report(result, model, statuses, args.rate)
+    stage_metrics.print_summary("Stage timings (both services)")
+
+    if args.save:
+        with open(args.save, "w") as f: json.dump([result], f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f: slower = compare([result], json.load(f), args.tolerance)
+        if slower:
+            print(f"\n❌ {len(slower)} latency figure(s) regressed beyond {args.tolerance:.0%}:")
+            for scale, stage, old_s, new_s in slower: print(f"   - {scale} {stage}: {old_s:.4f}s -> {new_s:.4f}s")
+            return 1
+        print("\n✅ No regressions against baseline.")
+    return 0 if result["ok"] == result["events"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,128 @@
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning) # Fixes the console spam
 
+import os
+import sys
+import argparse
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-import gspread
-# Replace the old imports
-from google.oauth2.service_account import Credentials # Modern library
-# from oauth2client.service_account import ServiceAccountCredentials # Remove this line
 
+from urllib.parse import urlsplit
 from datetime import datetime
 import project_metrics 
-from prompt_engine import ExecutiveReportContext # Import the new module
+from prompt_engine import ExecutiveReportContext, estimate_tokens # Import the new module
+from sheet_writer import BufferedSheetWriter
+from analysis_history import AnalysisHistory
+from run_journal import RunJournal
+from analysis_fingerprints import FingerprintStore, analysis_fingerprint
+import data_store # Sheets or local SQLite backend (MC_DATA_STORE)
+import stage_metrics # Per-stage span timings, summarized at the end of the run
+import agent_http # Shared pooled client (timeouts + retries)
 
 # CONFIG
 AGENT_URL = "http://localhost:8081/"
-SPREADSHEET_NAME = "Mission Control Log"
-JSON_KEYFILE = "credentials.json"
+AGENT_STREAM_URL = AGENT_URL + "stream"                   # Chunked JSON-lines variant of the same endpoint
+AGENT_STREAM = os.environ.get("MC_AGENT_STREAM", "1") == "1"
+PROMPT_TOKEN_BUDGET = int(os.environ.get("MC_PROMPT_TOKEN_BUDGET", 0))   # 0 = full prompt, no compaction
+SPREADSHEET_NAME = data_store.SPREADSHEET_NAME
+MAX_WORKERS = int(os.environ.get("MC_MAX_WORKERS", 4))   # Concurrent projects in flight
+AGENT_RPM = float(os.environ.get("MC_AGENT_RPM", 60))     # Requests/minute to the model endpoint (0 = unlimited)
+
+class RateLimiter:
+    """Thread-safe requests-per-minute limiter: hands out evenly spaced call slots."""
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval: return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+agent_limiter = RateLimiter(AGENT_RPM)
+no_stream_hosts = set() # Hosts whose server answered 404 on /stream: go straight to the plain POST
+
+def ask_agent(payload):
+    """
+    Sends one prompt to the model endpoint and returns the generated text.
+    With MC_AGENT_STREAM the streaming endpoint is consumed chunk by chunk as tokens arrive;
+    servers without it (404) fall back to the plain POST, remembered per host for the rest of the run.
+    """
+    with stage_metrics.span("rate_limit_wait"): agent_limiter.wait()
+    with stage_metrics.span("llm"):
+        content = _request_agent(payload)
+    stage_metrics.inc("llm_tokens_total", estimate_tokens(payload["details"]["project_context"]), kind="prompt")
+    stage_metrics.inc("llm_tokens_total", estimate_tokens(content or ""), kind="completion")
+    return content
+
+def _request_agent(payload):
+    host = urlsplit(AGENT_STREAM_URL).netloc
+    if AGENT_STREAM and host not in no_stream_hosts:
+        start = time.perf_counter()
+        parts = []
+        try:
+            for event in agent_http.stream_lines(AGENT_STREAM_URL, json=payload):
+                kind = event.get("type")
+                if kind == "chunk":
+                    if not parts:
+                        first = time.perf_counter() - start
+                        stage_metrics.registry.observe("llm_first_chunk_seconds", first)
+                        print(f"   📝 Streaming report (first chunk after {first:.2f}s)...")
+                    parts.append(event.get("content", ""))
+                elif kind == "done":
+                    return event.get("content") or "".join(parts)
+                elif kind == "error":
+                    raise RuntimeError(event.get("error"))
+                elif kind is None and "content" in event:
+                    return event["content"] # Server without streaming answered with a plain reply
+            # No 'done' line: the stream was cut off, so the parts are not a complete report
+            raise RuntimeError(f"Agent stream ended before completion ({len(parts)} chunks received)")
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404: raise
+            no_stream_hosts.add(host)
+    resp = agent_http.post(AGENT_URL, json=payload)
+    return resp.json().get('content')
+
+class ThreadLocalStdout:
+    """
+    Routes print() from worker threads to the real stdout as soon as each line is complete,
+    prefixed with the thread's project, so concurrent progress (e.g. streaming) shows up live.
+    """
+    def __init__(self, real):
+        self.real = real
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def start(self, prefix):
+        self.local.prefix, self.local.partial = prefix, ""
+
+    def end(self):
+        if self.local.partial: self.write("\n")
+        self.local.prefix = None
+
+    def write(self, text):
+        prefix = getattr(self.local, "prefix", None)
+        if prefix is None: return self.real.write(text)
+        *lines, self.local.partial = (self.local.partial + text).split("\n")
+        if lines:
+            with self.lock:
+                self.real.write("".join(f"{prefix}{line}\n" if line else "\n" for line in lines))
+                self.real.flush()
+        return len(text)
+
+    def flush(self):
+        self.real.flush()
 
 def get_sh():
-    scope = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    # This reads your credentials.json perfectly
-    creds = Credentials.from_service_account_file(JSON_KEYFILE, scopes=scope)
-    return gspread.authorize(creds).open(SPREADSHEET_NAME)
+    # Google Sheets (credentials.json) by default; MC_DATA_STORE=sqlite runs offline against a local file
+    return data_store.open_store(name=SPREADSHEET_NAME)
 
 def generate_simulated_manager_action(ai_advice, project_name):
     """Roleplays the Operations Manager if data is missing."""
@@ -36,61 +135,80 @@ def generate_simulated_manager_action(ai_advice, project_name):
     """
     try:
         payload = {"details": {"current_value": 0, "project_context": prompt}}
-        resp = requests.post(AGENT_URL, json=payload)
-        return "Simulated: " + resp.json().get('content').strip()
+        return "Simulated: " + ask_agent(payload).strip()
     except: return "Simulated: Manager unavailable."
 
-def fetch_previous_learning(sh, pid, current_period, simulate_mode):
+def fetch_previous_learning(sh, pid, current_period, simulate_mode, log_writer=None, history=None):
     try:
-        w = sh.worksheet("AI_Analysis_Log")
-        rows = w.get_all_values()
-        if len(rows) < 2: return None
-        
-        headers = rows[0]
-        cols = {h: i for i, h in enumerate(headers)}
+        # Pass a per-run AnalysisHistory to avoid re-downloading the log for every project
+        if history is None: history = AnalysisHistory.from_sheet(sh)
+        cols = history.cols
         
         # Robust check to ensure columns exist
         if "Project ID" not in cols or "Actual Action Taken" not in cols:
             return None
 
-        for r_idx, r in enumerate(rows):
-            if r_idx == 0: continue
-            
-            # Logic: Find the row for this project from a DIFFERENT period
-            if r[cols["Project ID"]] == pid and r[cols["Period"]] != current_period:
-                action_taken = r[cols["Actual Action Taken"]]
-                data_source = "User Input (Verified)"
-                
-                # --- SIMULATION LOGIC ---
-                if not action_taken or action_taken.strip() == "":
-                    if simulate_mode:
-                        print(f"      🤖 Simulation Active: Roleplaying Manager for {r[cols['Period']]}...")
-                        simulated_action = generate_simulated_manager_action(r[cols["AI Strategy"]], pid)
-                        # Write back to Sheet so we remember it next time
-                        w.update_cell(r_idx + 1, cols["Actual Action Taken"] + 1, simulated_action)
-                        action_taken = simulated_action
-                        data_source = "⚠️ MISSING DATA (AI Simulation Triggered)"
-                    else:
-                        action_taken = "No action recorded."
-                        data_source = "⚠️ MISSING DATA (Empty Cell)"
-                # ------------------------
-
-                return {
-                    "prev_cpi": float(r[cols["CPI"]]),
-                    "human_action": action_taken,
-                    "source_status": data_source
-                }
+        # Logic: Latest logged period BEFORE the current one
+        found = history.previous(pid, current_period)
+        if not found: return None
+        sheet_row, r = found
+
+        action_taken = r[cols["Actual Action Taken"]]
+        data_source = "User Input (Verified)"
+        action_missing = not action_taken or action_taken.strip() == ""
+        
+        # --- SIMULATION LOGIC ---
+        if action_missing:
+            if simulate_mode:
+                print(f"      🤖 Simulation Active: Roleplaying Manager for {r[cols['Period']]}...")
+                simulated_action = generate_simulated_manager_action(r[cols["AI Strategy"]], pid)
+                # Write back to Sheet so we remember it next time
+                writer = log_writer or sh.worksheet("AI_Analysis_Log")
+                writer.update_cell(sheet_row, cols["Actual Action Taken"] + 1, simulated_action)
+                r[cols["Actual Action Taken"]] = simulated_action
+                action_taken = simulated_action
+                data_source = "⚠️ MISSING DATA (AI Simulation Triggered)"
+            else:
+                action_taken = "No action recorded."
+                data_source = "⚠️ MISSING DATA (Empty Cell)"
+        # ------------------------
+
+        return {
+            "prev_cpi": float(r[cols["CPI"]]),
+            "human_action": action_taken,
+            "source_status": data_source,
+            "action_missing": action_missing # The logged cell was empty (simulated or not)
+        }
     except Exception as e:
         print(f"      ❌ History Read Error: {e}")
     return None
 
-def run_agent_analysis(metrics, slippage, project_info, sh, simulate_mode):
+def run_agent_analysis(metrics, slippage, project_info, sh, simulate_mode, log_writer=None, history=None, journal=None, fingerprints=None):
     pid = project_info['id']
     pname = project_info['name']
     period = project_info['period']
     
-    # 1. FETCH MEMORY
-    memory = fetch_previous_learning(sh, pid, period, simulate_mode)
+    # 1. FETCH MEMORY (as logged: the manager action is only simulated for projects that are analyzed)
+    with stage_metrics.span("history_lookup"):
+        memory = fetch_previous_learning(sh, pid, period, False, log_writer, history)
+
+    # Same budget rows + same learning as the last logged report -> reuse it, no model call
+    fingerprint = None
+    if fingerprints and project_info.get('rows_fingerprint'):
+        fingerprint = analysis_fingerprint(project_info['rows_fingerprint'], memory, PROMPT_TOKEN_BUDGET)
+        stored = history.latest(pid, period) if history else None
+        entry = fingerprints.unchanged(pid, period, fingerprint) if stored else None
+        if entry:
+            stage_metrics.inc("analyses_reused_total")
+            logged_at = datetime.fromtimestamp(entry["ts"]).strftime("%Y-%m-%d %H:%M")
+            print(f"   ♻️  Unchanged since {logged_at}: reusing stored report (sheet row {stored[0]}).")
+            return None
+
+    if simulate_mode and memory and memory["action_missing"]:
+        with stage_metrics.span("history_lookup"):
+            memory = fetch_previous_learning(sh, pid, period, True, log_writer, history)
+        # The simulated action is written back to the log, so the next run reads (and fingerprints) it
+        if fingerprint: fingerprint = analysis_fingerprint(project_info['rows_fingerprint'], memory, PROMPT_TOKEN_BUDGET)
     
     # 2. BUILD AUDIT LIST
     audit_list = [f"1. Budget Data: FOUND (Period {period})"]
@@ -114,45 +232,154 @@ def run_agent_analysis(metrics, slippage, project_info, sh, simulate_mode):
             cpi=metrics['cpi'],
             variance=metrics['variance'],
             bleeding_items=metrics['root_causes'],
+            bleeding_details=metrics.get('root_cause_details', []),
             data_sources=audit_list,
             prev_action=prev_action_text,
-            prev_result=prev_result_text
+            prev_result=prev_result_text,
+            token_budget=PROMPT_TOKEN_BUDGET or None
         )
-        final_prompt = context.render()
+        with stage_metrics.span("prompt_render"): final_prompt, prompt_stats = context.render_with_stats()
+        if PROMPT_TOKEN_BUDGET:
+            print(f"   🧮 Prompt ~{prompt_stats['tokens']} tokens (saved {prompt_stats['saved_tokens']}, "
+                  f"{prompt_stats['items_summarized']} items summarized)")
         
     except Exception as e:
         print(f"❌ Pydantic Validation Error: {e}")
-        return
+        return f"Pydantic Validation Error: {e}"
 
     # 4. SEND TO AI
     try:
-        payload = {"details": {"current_value": metrics["cpi"], "project_context": final_prompt}}
-        resp = requests.post(AGENT_URL, json=payload)
+        payload = {"project_id": pid, "period": period, "details": {"current_value": metrics["cpi"], "project_context": final_prompt}}
+        content = ask_agent(payload)
         
-        # Log to Sheet
-        w = sh.worksheet("AI_Analysis_Log")
+        # Log to Sheet (checkpoint first: a crash before the flush must not cost another model call)
+        w = log_writer or sh.worksheet("AI_Analysis_Log")
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        w.append_row([timestamp, pid, pname, period, metrics["cpi"], resp.json().get('content'), ""])
-        print("   ✅ Report Logged.")
+        row = [timestamp, pid, pname, period, metrics["cpi"], content, ""]
+        if journal: journal.record_generated(journal.key(pid, period), row, project_info.get('rows_fingerprint'))
+        # Recorded before the append: the append (or another worker) may flush and confirm it right away
+        if fingerprint: fingerprints.record(pid, period, fingerprint)
+        w.append_row(row)
+        if journal and not log_writer: journal.mark_logged([journal.key(pid, period)])
+        if fingerprint and not log_writer: fingerprints.confirm([(pid, period)])
+        print("   ✅ Report Queued." if log_writer else "   ✅ Report Logged.")
     except Exception as e:
         print(f"❌ AI Error: {e}")
+        return f"AI Error: {e}"
+
+def process_project(budget_index, pid, info, sh, simulate_mode, log_writer=None, history=None, journal=None, fingerprints=None):
+    """One unit of work. Returns an error message, or None on success."""
+    print(f"\n🔹 Processing {info['name']} ({info['latest_period']})...")
+    rows_fingerprint = budget_index.fingerprint(pid, info['latest_period'])
+    # A checkpoint only counts while the project's Budget_Tracking rows are the ones it was built from
+    if journal and journal.status(journal.key(pid, info['latest_period']), rows_fingerprint):
+        print("   ⏭️  Already done in this run (checkpoint). Skipped.")
+        return None
+    with stage_metrics.span("metrics"):
+        metrics = project_metrics.calculate_financials(budget_index, pid, info['latest_period'])
+    project_info = {'id': pid, 'name': info['name'], 'period': info['latest_period'],
+                    'rows_fingerprint': rows_fingerprint}
+    return run_agent_analysis(metrics, [], project_info, sh, simulate_mode, log_writer, history, journal, fingerprints)
+
+def run_portfolio(budget_index, active_projects, sh, simulate_mode, log_writer=None, history=None, max_workers=MAX_WORKERS, journal=None, fingerprints=None):
+    """
+    Runs process_project for every project on a bounded thread pool.
+    Output lines are printed as they happen, prefixed with their project when several run at once;
+    errors are collected per project.
+    """
+    errors = {}
+    real_stdout = sys.stdout
+    proxy = ThreadLocalStdout(real_stdout)
+    workers = max(1, max_workers)
+
+    def task(pid, info):
+        proxy.start(f"[{pid}] " if workers > 1 else "")
+        try:
+            return process_project(budget_index, pid, info, sh, simulate_mode, log_writer, history, journal, fingerprints)
+        except Exception as e:
+            print(f"❌ Unhandled Error: {e}")
+            return f"Unhandled Error: {e}"
+        finally:
+            proxy.end()
+
+    sys.stdout = proxy
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(pid, pool.submit(task, pid, info)) for pid, info in active_projects.items()]
+            for pid, future in futures:
+                err = future.result()
+                if err: errors[pid] = err
+    finally:
+        sys.stdout = real_stdout
+    return errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mission Control portfolio analysis.")
+    parser.add_argument("--fresh", action="store_true", help="Abandon an unfinished run instead of resuming it")
+    parser.add_argument("--force", action="store_true", help="Re-analyze projects whose inputs have not changed")
+    args = parser.parse_args(argv)
 
-def main():
     sh = get_sh()
     print("\n🚀 MISSION CONTROL: SIMULATION CENTER")
+    print(f"🗄️  Data store: {data_store.DATA_STORE}")
     
     user_input = input("🤖 Enable AI Manager Simulation? (y/n): ").strip().lower()
     simulate_mode = (user_input == 'y')
 
-    try: budget_rows = sh.worksheet("Budget_Tracking").get_all_values()
+    # One streaming pass: only per-(Project ID, Report Period) totals are kept, never the whole tab
+    try:
+        with stage_metrics.span("sheets_read", tab="Budget_Tracking"):
+            budget_index = project_metrics.BudgetSummary(data_store.iter_rows(sh.worksheet("Budget_Tracking")))
     except: print("❌ Error reading Budget Sheet."); return
+    if budget_index.errors:
+        print(f"⚠️  {len(budget_index.errors)} Budget_Tracking money cells are not numbers (counted as 0):")
+        for e in budget_index.errors[:5]: print(f"   - row {e.row}, {e.column}: {e.value!r}")
 
-    active_projects = project_metrics.get_active_projects(budget_rows)
+    active_projects = project_metrics.get_active_projects(budget_index)
     
-    for pid, info in active_projects.items():
-        print(f"\n🔹 Processing {info['name']} ({info['latest_period']})...")
-        metrics = project_metrics.calculate_financials(budget_rows, pid, info['latest_period'])
-        run_agent_analysis(metrics, [], {'id': pid, 'name': info['name'], 'period': info['latest_period']}, sh, simulate_mode)
+    # Load the learning log ONCE per run
+    try:
+        with stage_metrics.span("sheets_read", tab="AI_Analysis_Log"): history = AnalysisHistory.from_sheet(sh)
+    except Exception as e: print(f"❌ Error reading AI_Analysis_Log: {e}"); history = AnalysisHistory([])
+
+    # Checkpoint journal: a crashed run resumes where it stopped instead of starting over
+    journal = RunJournal(fresh=args.fresh)
+    if journal.resumed:
+        c = journal.counts()
+        print(f"♻️  Resuming run {journal.run_id}: {c['logged']} units done, {c['generated']} to re-log without model calls")
+
+    # Input fingerprints of the last logged analyses: unchanged projects are not sent to the model again
+    fingerprints = FingerprintStore(force=args.force)
+
+    def checkpoint_flushed(rows, cells):
+        journal.mark_logged([journal.key(r[1], r[3]) for r in rows])
+        fingerprints.confirm([(r[1], r[3]) for r in rows])
+
+    # Write-behind buffer: log rows & simulated actions go out in a few batch calls, not one per project
+    print(f"⚙️  Concurrency: {MAX_WORKERS} workers, {AGENT_RPM:g} agent req/min, streaming {'on' if AGENT_STREAM else 'off'}")
+    with BufferedSheetWriter(sh.worksheet("AI_Analysis_Log"), on_flush=checkpoint_flushed) as log_writer:
+        for key, row, inputs in journal.pending_rows():
+            if inputs is not None and inputs != budget_index.fingerprint(row[1], row[3]): continue # Stale: re-analyzed below
+            if history.has_row(row): journal.mark_logged([key]) # Reached the sheet before the crash
+            else: log_writer.append_row(row)
+        errors = run_portfolio(budget_index, active_projects, sh, simulate_mode, log_writer, history, journal=journal, fingerprints=fingerprints)
+    print("\n💾 AI_Analysis_Log flushed.")
+    fingerprints.save()
+    if fingerprints.skipped:
+        print(f"♻️  {fingerprints.skipped}/{len(active_projects)} projects unchanged since their last report (use --force to re-run them)")
+
+    # Only a fully successful run is closed; otherwise the next start retries just the failed units
+    if not errors: journal.complete()
+    journal.close()
+
+    if errors:
+        print(f"\n⚠️  {len(errors)}/{len(active_projects)} projects failed:")
+        for pid, err in errors.items(): print(f"   - {pid}: {err}")
+
+    for host, s in agent_http.latency_stats().items():
+        print(f"📡 {host}: {s['calls']} calls, {s['errors']} errors, avg {s['avg_s']:.2f}s, max {s['max_s']:.2f}s")
+
+    stage_metrics.print_summary("Stage timings (this run)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+
+# CONFIG (defaults of MockGenerativeModel, e.g. when the Strategist runs with MOCK_LLM=1)
+LATENCY = os.environ.get("MOCK_LLM_LATENCY", "lognormal:0.8,0.5")     # Time to first token, seconds
+OUTPUT_TOKENS = os.environ.get("MOCK_LLM_OUTPUT_TOKENS", "uniform:150,400")
+TOKENS_PER_S = float(os.environ.get("MOCK_LLM_TOKENS_PER_S", 80))      # Decode speed per call (0 = instant)
+ERROR_RATE = float(os.environ.get("MOCK_LLM_ERROR_RATE", 0.0))         # Share of calls that fail
+MAX_CONCURRENCY = int(os.environ.get("MOCK_LLM_MAX_CONCURRENCY", 0))   # >0: calls beyond this queue, like a quota
+SEED = os.environ.get("MOCK_LLM_SEED")
+
+WORDS = ("reduce", "overtime", "rebaseline", "crew", "steel", "freeze", "scope", "vendor", "claim", "float",
+         "resequence", "procurement", "contingency", "critical", "path", "cost", "plan", "review")
+
+class MockLLMError(RuntimeError):
+    """Simulated endpoint failure (quota exhausted / unavailable)."""
+
+def parse_distribution(spec):
+    """
+    Sampler for a distribution spec: "0.5" or "fixed:0.5", "uniform:LOW,HIGH", "normal:MEAN,STDDEV",
+    "lognormal:MEDIAN,SIGMA" or "exponential:MEAN". Samples are never negative.
+    """
+    kind, _, args = str(spec).partition(":")
+    if not args: kind, args = "fixed", kind
+    try: params = [float(a) for a in args.split(",")]
+    except ValueError: raise ValueError(f"Bad distribution: {spec!r}")
+    samplers = {
+        "fixed": (1, lambda rng, v: v),
+        "uniform": (2, lambda rng, lo, hi: rng.uniform(lo, hi)),
+        "normal": (2, lambda rng, mu, sd: rng.gauss(mu, sd)),
+        "lognormal": (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0),
+        "exponential": (1, lambda rng, mean: rng.expovariate(1 / mean) if mean > 0 else 0.0),
+    }
+    if kind not in samplers or len(params) != samplers[kind][0]: raise ValueError(f"Bad distribution: {spec!r}")
+    fn = samplers[kind][1]
+    return lambda rng: max(0.0, fn(rng, *params))
+
+class _Usage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+class _Response:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+class MockGenerativeModel:
+    """
+    Offline stand-in for vertexai's GenerativeModel (generate_content, incl. stream=True and
+    JSON-packed prompts). Each call waits a sampled time to first token, then emits the sampled
+    number of output tokens at tokens_per_s; error_rate of the calls raise MockLLMError instead.
+    """
+    def __init__(self, latency=LATENCY, output_tokens=OUTPUT_TOKENS, tokens_per_s=TOKENS_PER_S,
+                 error_rate=ERROR_RATE, max_concurrency=MAX_CONCURRENCY, seed=SEED):
+        self.latency = parse_distribution(latency)
+        self.output_tokens = parse_distribution(output_tokens)
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"calls": 0, "errors": 0, "output_tokens": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def _plan(self, prompt, parts):
+        with self.lock:
+            self.counts["calls"] += 1
+            self.counts["in_flight"] += 1
+            self.counts["max_in_flight"] = max(self.counts["max_in_flight"], self.counts["in_flight"])
+            fail = self.rng.random() < self.error_rate
+            first = self.latency(self.rng)
+            tokens = [max(1, int(self.output_tokens(self.rng))) for _ in range(parts)]
+            words = [[self.rng.choice(WORDS) for _ in range(n)] for n in tokens]
+        return fail, first, words
+
+    def _done(self, failed, tokens):
+        with self.lock:
+            self.counts["in_flight"] -= 1
+            if failed: self.counts["errors"] += 1
+            else: self.counts["output_tokens"] += tokens
+
+    def _decode_s(self, tokens):
+        return tokens / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        prompt = str(prompt)
+        config = generation_config or {}
+        packed = config.get("response_mime_type") == "application/json"
+        parts = max(1, prompt.count("### REQUEST ")) if packed else 1
+        if stream: return self._stream(prompt)
+
+        if self.slots: self.slots.acquire()
+        fail, first, words = self._plan(prompt, parts)
+        tokens = sum(len(w) for w in words)
+        try:
+            time.sleep(first + (0 if fail else self._decode_s(tokens)))
+            if fail: raise MockLLMError("429 Resource exhausted (simulated)")
+        finally:
+            self._done(fail, tokens)
+            if self.slots: self.slots.release()
+        texts = ["[MOCK] " + " ".join(w) for w in words]
+        text = json.dumps({"results": [{"id": i + 1, "content": t} for i, t in enumerate(texts)]}) if packed else texts[0]
+        return _Response(text, _Usage(len(prompt) // 4, tokens))
+
+    def _stream(self, prompt, chunk_tokens=8):
+        if self.slots: self.slots.acquire()
+        fail, first, words = self._plan(prompt, 1)
+        words = words[0]
+        try:
+            time.sleep(first)
+            if fail: raise MockLLMError("429 Resource exhausted (simulated)")
+            for i in range(0, len(words), chunk_tokens):
+                chunk = words[i:i + chunk_tokens]
+                if i: time.sleep(self._decode_s(len(chunk)))
+                last = i + chunk_tokens >= len(words)
+                yield _Response(("[MOCK] " if not i else " ") + " ".join(chunk),
+                                _Usage(len(prompt) // 4, len(words)) if last else None)
+        finally:
+            self._done(fail, len(words))
+            if self.slots: self.slots.release()
+
+    def stats(self):
+        with self.lock: return dict(self.counts)
@@ -1,34 +1,153 @@
+import hashlib
 from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
+from column_decoding import DATE_FORMATS, CurrencyDecoder, decode_currency, decode_dates
+
+_date_formats = DATE_FORMATS # Most recently matched format first (rebound, never mutated: thread-safe)
 
 def clean_currency(value_str):
+    """Lenient scalar parse (bad cells -> 0.0). Column-wise callers use column_decoding, which reports them."""
     try: return float(str(value_str).replace('$', '').replace(',', '').strip())
-    except: return 0.0
+    except (TypeError, ValueError): return 0.0
 
+@lru_cache(maxsize=4096)
 def parse_date(date_str):
-    for fmt in ("%Y-%m-%d", "%b-%d", "%d-%b-%Y", "%Y-%m"):
-        try: return datetime.strptime(date_str, fmt)
-        except ValueError: pass
+    # The formats are mutually exclusive, so trying the last one that matched first is safe
+    global _date_formats
+    formats = _date_formats
+    for fmt in formats:
+        try: parsed = datetime.strptime(date_str, fmt)
+        except (TypeError, ValueError): continue
+        if fmt != formats[0]: _date_formats = (fmt,) + tuple(f for f in formats if f != fmt)
+        return parsed
     return None
 
+def _row_bytes(r):
+    return ("\x1f".join(map(str, r)) + "\x1e").encode("utf-8")
+
+def rows_fingerprint(rows):
+    """Digest of a group's raw rows, in sheet order: any edited cell, added or removed row changes it."""
+    h = hashlib.sha256()
+    for r in rows: h.update(_row_bytes(r))
+    return h.hexdigest()
+
+class BudgetIndex:
+    """
+    Single-pass index over the Budget_Tracking rows.
+    Groups rows by (Project ID, Report Period) and tracks the latest ACTIVE period per project,
+    so per-project lookups only touch the rows of their own group.
+    """
+    def __init__(self, rows):
+        self.cols = {}
+        self.groups = {}
+        self.active = {}
+        if not rows: return
+        self.cols = {h: i for i, h in enumerate(rows[0])}
+
+        idx_id = self.cols.get("Project ID")
+        idx_period = self.cols.get("Report Period")
+        if idx_id is None or idx_period is None: return
+        idx_name = self.cols.get("Project Name")
+        idx_status = self.cols.get("Status")
+        track_active = idx_name is not None and idx_status is not None
+
+        for r in rows[1:]:
+            pid, period = r[idx_id], r[idx_period]
+            self.groups.setdefault((pid, period), []).append(r)
+
+            if track_active and r[idx_status].upper() == "ACTIVE":
+                if pid not in self.active or period > self.active[pid]['latest_period']:
+                    self.active[pid] = {'name': r[idx_name], 'latest_period': period}
+
+    def rows_for(self, project_id, period):
+        return self.groups.get((project_id, period), [])
+
+    def fingerprint(self, project_id, period):
+        return rows_fingerprint(self.rows_for(project_id, period))
+
+class BudgetSummary:
+    """
+    Streaming alternative to BudgetIndex for exports too large to hold in memory.
+    Consumes ANY row iterator (header row first: a CSV reader, a paged Sheets reader...) in ONE pass
+    and keeps only running totals, root causes and a running row digest per (Project ID, Report Period),
+    so memory is bounded by the number of groups, not the number of rows.
+    """
+    def __init__(self, rows):
+        self.cols = {}
+        self.groups = {}
+        self.digests = {}
+        self.active = {}
+        self.errors = [] # CellError(column, sheet row, value) for money cells that are not numbers
+        it = iter(rows)
+        header = next(it, None)
+        if not header: return
+        c = self.cols = {h: i for i, h in enumerate(header)}
+
+        idx_id = c.get("Project ID")
+        idx_period = c.get("Report Period")
+        if idx_id is None or idx_period is None: return
+        idx_name = c.get("Project Name")
+        idx_status = c.get("Status")
+        track_active = idx_name is not None and idx_status is not None
+        # Without the cost columns there is nothing to total, but the active projects still count (as BudgetIndex)
+        has_money = all(h in c for h in ("Cost Category", "Budget (BAC)", "Earned Value (EV)", "Actual Cost (AC)"))
+        if has_money:
+            idx_cat, idx_bac = c["Cost Category"], c["Budget (BAC)"]
+            idx_ev, idx_ac = c["Earned Value (EV)"], c["Actual Cost (AC)"]
+            idx_pv = c.get("Planned Value (PV)")
+        money = CurrencyDecoder()
+        self.errors = money.errors
+
+        for row_num, r in enumerate(it, start=2):
+            pid, period = r[idx_id], r[idx_period]
+            if track_active and r[idx_status].upper() == "ACTIVE":
+                if pid not in self.active or period > self.active[pid]['latest_period']:
+                    self.active[pid] = {'name': r[idx_name], 'latest_period': period}
+            if not has_money: continue
+
+            # [bac, ev, ac, pv, root_causes, root_cause_details]
+            g = self.groups.get((pid, period))
+            if g is None:
+                g = self.groups[(pid, period)] = [0.0, 0, 0, 0, [], []]
+                self.digests[(pid, period)] = hashlib.sha256()
+            self.digests[(pid, period)].update(_row_bytes(r))
+
+            # Same rules as calculate_financials, one row at a time
+            cat = r[idx_cat]
+            ev = money(r[idx_ev], "Earned Value (EV)", row_num)
+            ac = money(r[idx_ac], "Actual Cost (AC)", row_num)
+            pv = money(r[idx_pv], "Planned Value (PV)", row_num) if idx_pv is not None else ev
+            row_cpi = ev / ac if ac > 0 else 0
+            cat_upper = cat.upper()
+            if row_cpi < 0.95 and "TOTAL" not in cat_upper:
+                g[4].append(f"{cat} (CPI: {row_cpi:.2f})")
+                g[5].append({"category": cat, "cpi": row_cpi, "ac": ac})
+            if "TOTAL PROJECT" in cat_upper:
+                g[0], g[1], g[2], g[3] = money(r[idx_bac], "Budget (BAC)", row_num), ev, ac, pv
+
+    def financials(self, project_id, period):
+        g = self.groups.get((project_id, period))
+        if g is None: return _final_metrics(0.0, 0, 0, 0, [], [])
+        return _final_metrics(g[0], g[1], g[2], g[3], list(g[4]), list(g[5]))
+
+    def fingerprint(self, project_id, period):
+        """Same value as rows_fingerprint over the group's rows (BudgetIndex.fingerprint)."""
+        h = self.digests.get((project_id, period))
+        return h.hexdigest() if h else rows_fingerprint([])
+
+    def portfolio(self):
+        return {k: self.financials(*k) for k in self.groups}
+
+def _as_index(rows):
+    """Lists are indexed (BudgetIndex); any other iterable is aggregated in one streaming pass."""
+    if isinstance(rows, (BudgetIndex, BudgetSummary)): return rows
+    if isinstance(rows, list): return BudgetIndex(rows)
+    return BudgetSummary(rows)
+
 def get_active_projects(rows):
-    projects = {}
-    if not rows: return projects
-    headers = rows[0]
-    cols = {h: i for i, h in enumerate(headers)}
-    
-    try:
-        idx_id = cols["Project ID"]
-        idx_name = cols["Project Name"]
-        idx_status = cols["Status"]
-        idx_period = cols["Report Period"]
-    except KeyError: return {}
-
-    for r in rows[1:]:
-        if r[idx_status].upper() == "ACTIVE":
-            pid = r[idx_id]
-            if pid not in projects or r[idx_period] > projects[pid]['latest_period']:
-                projects[pid] = {'name': r[idx_name], 'latest_period': r[idx_period]}
-    return projects
+    """Accepts raw sheet rows, any row iterator, or a prebuilt BudgetIndex / BudgetSummary."""
+    return dict(_as_index(rows).active)
 
 def calculate_ai_forecast(start_date_str, baseline_end_str, spi):
     """
@@ -54,41 +173,30 @@ def calculate_ai_forecast(start_date_str, baseline_end_str, spi):
     ai_end_date = start_date + timedelta(days=forecast_duration)
     return ai_end_date.strftime("%Y-%m-%d")
 
-def calculate_financials(rows, project_id, period):
-    metrics = {"cpi": 0.0, "spi": 0.0, "bac": 0.0, "eac": 0.0, "variance": 0.0, "tcpi": 0.0, "root_causes": []}
-    
-    headers = rows[0]
-    # Dynamic Mapping
-    c = {h: i for i, h in enumerate(headers)}
-    
-    total_ev = 0
-    total_ac = 0
-    total_pv = 0
+def calculate_ai_forecasts(start_date_strs, baseline_end_strs, spis):
+    """
+    Column-wise calculate_ai_forecast for a whole schedule: each date column's format is
+    inferred once and decoded in bulk, and the SPI scaling runs vectorized. Same outputs per row.
+    """
+    starts = decode_dates(start_date_strs).values
+    ends = decode_dates(baseline_end_strs).values
+    spi = np.asarray(spis, dtype=np.float64)
 
-    for r in rows[1:]:
-        if r[c["Project ID"]] == project_id and r[c["Report Period"]] == period:
-            
-            # Extract Values
-            cat = r[c["Cost Category"]]
-            ev = clean_currency(r[c["Earned Value (EV)"]])
-            ac = clean_currency(r[c["Actual Cost (AC)"]])
-            # NEW: Handle Missing PV Column safely
-            pv = clean_currency(r[c["Planned Value (PV)"]]) if "Planned Value (PV)" in c else ev 
-
-            # Root Cause Detection
-            try:
-                # Calculate row-level CPI
-                row_cpi = ev / ac if ac > 0 else 0
-                if row_cpi < 0.95 and "TOTAL" not in cat.upper():
-                    metrics["root_causes"].append(f"{cat} (CPI: {row_cpi:.2f})")
-            except: pass
-
-            # Aggregate Totals
-            if "TOTAL PROJECT" in cat.upper():
-                metrics["bac"] = clean_currency(r[c["Budget (BAC)"]])
-                total_ev = ev
-                total_ac = ac
-                total_pv = pv
+    bad_dates = np.isnat(starts) | np.isnat(ends)
+    original = (ends - starts).astype("timedelta64[D]").astype(np.int64)
+    safe_spi = np.maximum(spi, 0.5)
+    # int() truncates toward zero
+    forecast = np.trunc(np.where(bad_dates, 0, original) / safe_spi).astype(np.int64)
+    ai_end = np.datetime_as_string(np.where(bad_dates, np.datetime64("1970-01-01"), starts) + forecast, unit="D")
+
+    out = ai_end.tolist()
+    for i in np.nonzero(bad_dates)[0].tolist(): out[i] = "Error (Bad Dates)"
+    for i in np.nonzero(spi <= 0)[0].tolist(): out[i] = "Unknown (SPI 0)"
+    return out
+
+def _final_metrics(bac, total_ev, total_ac, total_pv, root_causes, root_cause_details):
+    metrics = {"cpi": 0.0, "spi": 0.0, "bac": bac, "eac": 0.0, "variance": 0.0, "tcpi": 0.0,
+               "root_causes": root_causes, "root_cause_details": root_cause_details}
 
     # Final Calculations
     if total_ac > 0: metrics["cpi"] = round(total_ev / total_ac, 2)
@@ -102,4 +210,136 @@ def calculate_financials(rows, project_id, period):
         rem_work = metrics["bac"] - total_ev
         metrics["tcpi"] = (rem_work / rem_budget) if rem_budget != 0 else 9.99
 
-    return metrics
\ No newline at end of file
+    return metrics
+
+def calculate_financials(rows, project_id, period):
+    """
+    Accepts raw sheet rows, any row iterator, or a prebuilt BudgetIndex / BudgetSummary
+    (reuse one across projects).
+    """
+    index = _as_index(rows)
+    if isinstance(index, BudgetSummary): return index.financials(project_id, period)
+    metrics = {"cpi": 0.0, "spi": 0.0, "bac": 0.0, "eac": 0.0, "variance": 0.0, "tcpi": 0.0, "root_causes": [], "root_cause_details": []}
+    
+    # Dynamic Mapping
+    c = index.cols
+    
+    total_ev = 0
+    total_ac = 0
+    total_pv = 0
+
+    for r in index.rows_for(project_id, period):
+        # Extract Values
+        cat = r[c["Cost Category"]]
+        ev = clean_currency(r[c["Earned Value (EV)"]])
+        ac = clean_currency(r[c["Actual Cost (AC)"]])
+        # NEW: Handle Missing PV Column safely
+        pv = clean_currency(r[c["Planned Value (PV)"]]) if "Planned Value (PV)" in c else ev 
+
+        # Root Cause Detection
+        try:
+            # Calculate row-level CPI
+            row_cpi = ev / ac if ac > 0 else 0
+            if row_cpi < 0.95 and "TOTAL" not in cat.upper():
+                metrics["root_causes"].append(f"{cat} (CPI: {row_cpi:.2f})")
+                metrics["root_cause_details"].append({"category": cat, "cpi": row_cpi, "ac": ac})
+        except: pass
+
+        # Aggregate Totals
+        if "TOTAL PROJECT" in cat.upper():
+            metrics["bac"] = clean_currency(r[c["Budget (BAC)"]])
+            total_ev = ev
+            total_ac = ac
+            total_pv = pv
+
+    return _final_metrics(metrics["bac"], total_ev, total_ac, total_pv, metrics["root_causes"], metrics["root_cause_details"])
+
+def calculate_portfolio_financials(rows, errors=None):
+    """
+    Batch version of calculate_financials for every (Project ID, Report Period) in the sheet.
+    Columns are decoded into NumPy arrays once and the EVM maths runs vectorized per group.
+    Returns {(project_id, period): metrics} with values identical to the scalar path.
+    Non-list row iterators are aggregated in one streaming pass instead (see BudgetSummary).
+    Pass a list as `errors` to collect the money cells that could not be decoded (they count as 0.0).
+    """
+    if not isinstance(rows, (list, BudgetSummary)): rows = BudgetSummary(rows)
+    if isinstance(rows, BudgetSummary):
+        if errors is not None: errors.extend(rows.errors)
+        return rows.portfolio()
+    if not rows or len(rows) < 2: return {}
+    c = {h: i for i, h in enumerate(rows[0])}
+    body = rows[1:]
+
+    def column(name):
+        return [r[c[name]] for r in body]
+
+    def money(name):
+        decoded = decode_currency(column(name), name)
+        # Sheet row numbers, like BudgetSummary.errors
+        if errors is not None: errors.extend(e._replace(row=e.row + 2) for e in decoded.errors)
+        return decoded.filled(0.0)
+
+    # 1. Decode Columns (once)
+    pids = column("Project ID")
+    periods = column("Report Period")
+    cats = column("Cost Category")
+    ev = money("Earned Value (EV)")
+    ac = money("Actual Cost (AC)")
+    pv = money("Planned Value (PV)") if "Planned Value (PV)" in c else ev
+    bac = money("Budget (BAC)")
+
+    groups = {}
+    gid = np.fromiter((groups.setdefault(k, len(groups)) for k in zip(pids, periods)), dtype=np.int64, count=len(body))
+    n = len(groups)
+
+    cats_upper = np.char.upper(np.array(cats, dtype=str))
+    is_total = np.char.find(cats_upper, "TOTAL") >= 0
+    is_total_project = np.char.find(cats_upper, "TOTAL PROJECT") >= 0
+
+    # 2. Root Cause Mask (row-level CPI < 0.95, same rule as the scalar path)
+    row_cpi = np.divide(ev, ac, out=np.zeros_like(ev), where=ac > 0)
+    bleeding = (row_cpi < 0.95) & ~is_total
+
+    # 3. Totals: the LAST 'TOTAL PROJECT' row of each group wins
+    last = np.full(n, -1, dtype=np.int64)
+    tp_rows = np.nonzero(is_total_project)[0]
+    np.maximum.at(last, gid[tp_rows], tp_rows)
+    has_total = last >= 0
+    pick = last[has_total]
+
+    g_bac, g_ev, g_ac, g_pv = (np.zeros(n) for _ in range(4))
+    g_bac[has_total] = bac[pick]
+    g_ev[has_total] = ev[pick]
+    g_ac[has_total] = ac[pick]
+    g_pv[has_total] = pv[pick]
+
+    # 4. Final Calculations
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw_cpi = np.divide(g_ev, g_ac, out=np.zeros(n), where=g_ac > 0)
+        raw_spi = np.divide(g_ev, g_pv, out=np.zeros(n), where=g_pv > 0)
+        # Python's round() is correctly rounded on the decimal repr; np.round is not, so round per group
+        cpi = np.array([round(x, 2) for x in raw_cpi.tolist()])
+        spi = np.array([round(x, 2) for x in raw_spi.tolist()])
+
+        has_cpi = cpi > 0
+        eac = np.where(has_cpi, g_bac / np.where(has_cpi, cpi, 1.0), 0.0)
+        variance = np.where(has_cpi, eac - g_bac, 0.0)
+        rem_budget = g_bac - g_ac
+        rem_work = g_bac - g_ev
+        tcpi = np.where(rem_budget != 0, rem_work / np.where(rem_budget != 0, rem_budget, 1.0), 9.99)
+        tcpi = np.where(has_cpi, tcpi, 0.0)
+
+    results = {}
+    for k, g in groups.items():
+        results[k] = {
+            "cpi": cpi[g].item(), "spi": spi[g].item(), "bac": g_bac[g].item(), "eac": eac[g].item(),
+            "variance": variance[g].item(), "tcpi": tcpi[g].item(), "root_causes": [], "root_cause_details": []
+        }
+
+    keys = list(groups)
+    for i in np.nonzero(bleeding)[0].tolist():
+        m = results[keys[gid[i]]]
+        m["root_causes"].append(f"{cats[i]} (CPI: {row_cpi[i]:.2f})")
+        m["root_cause_details"].append({"category": cats[i], "cpi": row_cpi[i].item(), "ac": ac[i].item()})
+
+    return results
@@ -1,5 +1,33 @@
+import math
+import re
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4 # Rough average for English prompts; good enough for budgeting
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def compact_whitespace(text: str) -> str:
+    """Strips indentation and trailing spaces and collapses runs of blank lines."""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return "\n".join(line for i, line in enumerate(lines) if line or (i and lines[i - 1]))
+
+class BleedingItem(BaseModel):
+    """One failing cost category, as ranked by the token-budgeted render."""
+    category: str
+    cpi: float
+    ac: float = 0.0
+
+    def label(self) -> str:
+        return f"{self.category} (CPI: {self.cpi:.2f})"
+
+    @classmethod
+    def from_label(cls, text: str) -> "BleedingItem":
+        # Fallback for plain "Category (CPI: 0.82)" strings, where the actual cost is unknown
+        m = re.match(r"^(.*) \(CPI: ([-\d.]+)\)$", text)
+        if not m: return cls(category=text, cpi=0.0)
+        return cls(category=m.group(1), cpi=float(m.group(2)))
 
 class ExecutiveReportContext(BaseModel):
     """
@@ -15,6 +43,10 @@ class ExecutiveReportContext(BaseModel):
     # Simulation Data
     prev_action: Optional[str] = None
     prev_result: Optional[str] = None
+
+    # Compaction: with a token budget, items are ranked by severity and the tail is summarized
+    bleeding_details: List[BleedingItem] = Field(default_factory=list)
+    token_budget: Optional[int] = None
     
     @validator('cpi')
     def validate_cpi(cls, v):
@@ -22,9 +54,59 @@ class ExecutiveReportContext(BaseModel):
         return v
 
     def render(self) -> str:
+        if self.token_budget is None: return self._render_template(self._bleeding_text(self.bleeding_items))
+        return self.render_with_stats()[0]
+
+    def ranked_items(self) -> List[BleedingItem]:
+        """Most severe first: lowest CPI, then largest actual cost."""
+        items = self.bleeding_details or [BleedingItem.from_label(t) for t in self.bleeding_items]
+        return sorted(items, key=lambda i: (i.cpi, -i.ac))
+
+    def render_with_stats(self) -> Tuple[str, dict]:
+        """
+        Returns (prompt, stats). Without a budget the prompt is the full render();
+        with one, whitespace is compacted and the most severe items that fit are kept,
+        the rest collapsed into "+N more items averaging CPI x".
+        """
+        full = self._render_template(self._bleeding_text(self.bleeding_items))
+        full_tokens = estimate_tokens(full)
+        n = len(self.bleeding_items or self.bleeding_details)
+        if self.token_budget is None:
+            return full, {"tokens": full_tokens, "full_tokens": full_tokens, "saved_tokens": 0,
+                          "items_kept": n, "items_summarized": 0, "within_budget": True}
+
+        ranked = self.ranked_items()
+        def build(k):
+            return compact_whitespace(self._render_template(self._bleeding_text(
+                [i.label() for i in ranked[:k]], ranked[k:]
+            )))
+
+        # Largest k whose prompt fits (prompt length grows with k)
+        lo, hi = 0, len(ranked)
+        if estimate_tokens(build(hi)) > self.token_budget:
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if estimate_tokens(build(mid)) <= self.token_budget: lo = mid
+                else: hi = mid - 1
+        prompt = build(hi)
+        tokens = estimate_tokens(prompt)
+        return prompt, {
+            "tokens": tokens, "full_tokens": full_tokens, "saved_tokens": full_tokens - tokens,
+            "items_kept": hi, "items_summarized": len(ranked) - hi,
+            "within_budget": tokens <= self.token_budget
+        }
+
+    @staticmethod
+    def _bleeding_text(labels, rest=()):
+        parts = list(labels)
+        if rest:
+            avg = sum(i.cpi for i in rest) / len(rest)
+            parts.append(f"+{len(rest)} more items averaging CPI {avg:.2f}")
+        return ", ".join(parts) if parts else "None"
+
+    def _render_template(self, bleeding_text: str) -> str:
         # 1. Format Lists
         sources_text = "\n".join(self.data_sources)
-        bleeding_text = ", ".join(self.bleeding_items) if self.bleeding_items else "None"
         
         # 2. Dynamic Learning Block
         if self.prev_action:
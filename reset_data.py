@@ -1,21 +1,23 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
+import sys
+import data_store
 
 # CONFIGURATION
-SPREADSHEET_NAME = "Mission Control Log"
-JSON_KEYFILE = "credentials.json"
-
-def reset_sheets():
-    print("🔌 Connecting to Google Sheets...")
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    creds = ServiceAccountCredentials.from_json_keyfile_name(JSON_KEYFILE, scope)
-    client = gspread.authorize(creds)
-    
-    try:
-        sh = client.open(SPREADSHEET_NAME)
-    except gspread.SpreadsheetNotFound:
-        print(f"❌ Error: Spreadsheet '{SPREADSHEET_NAME}' not found.")
-        return
+SPREADSHEET_NAME = data_store.SPREADSHEET_NAME
+
+def reset_sheets(backend=None):
+    """Seeds the three tabs on Google Sheets or the local SQLite store (default: MC_DATA_STORE)."""
+    backend = backend or data_store.DATA_STORE
+    if backend == "sqlite":
+        print(f"🔌 Opening local store '{data_store.SQLITE_PATH}'...")
+        sh = data_store.open_store(backend)
+    else:
+        print("🔌 Connecting to Google Sheets...")
+        import gspread # Only the Sheets backend needs it: seeding offline works without it installed
+        try:
+            sh = data_store.open_store(backend, name=SPREADSHEET_NAME)
+        except gspread.SpreadsheetNotFound:
+            print(f"❌ Error: Spreadsheet '{SPREADSHEET_NAME}' not found.")
+            return
 
     # ==========================================
     # 1. RESET BUDGET SHEET (With Full History)
@@ -24,10 +26,7 @@ def reset_sheets():
     try: w = sh.worksheet("Budget_Tracking"); w.clear()
     except: w = sh.add_worksheet("Budget_Tracking", 100, 20)
     
-    budget_headers = [
-        "Project ID", "Project Name", "Status", "Report Period", "Cost Category", 
-        "Budget (BAC)", "Planned Value (PV)", "Earned Value (EV)", "Actual Cost (AC)", "CPI (EV/AC)"
-    ]
+    budget_headers = list(data_store.TAB_HEADERS["Budget_Tracking"])
     
     budget_data = [budget_headers]
 
@@ -60,11 +59,7 @@ def reset_sheets():
     except: w = sh.add_worksheet("Schedule_Gantt", 100, 20)
 
     # 11 Columns to match your screenshot
-    gantt_headers = [
-        "Project ID", "Report Period", "Task ID", "Task Name", "Status", 
-        "Baseline Start", "Baseline End", "Forecast Start", "Forecast End", 
-        "Critical?", "Dependency"
-    ]
+    gantt_headers = list(data_store.TAB_HEADERS["Schedule_Gantt"])
     
     gantt_data = [gantt_headers]
 
@@ -99,10 +94,7 @@ def reset_sheets():
     try: w = sh.worksheet("AI_Analysis_Log"); w.clear()
     except: w = sh.add_worksheet("AI_Analysis_Log", 100, 20)
 
-    log_headers = [
-        "Timestamp", "Project ID", "Project Name", "Period", "CPI", 
-        "AI Strategy", "Actual Action Taken"
-    ]
+    log_headers = list(data_store.TAB_HEADERS["AI_Analysis_Log"])
     
     # Seeding Feb 2026 history so the "Learning Loop" works for the March 2026 report
     log_data = [
@@ -121,4 +113,5 @@ def reset_sheets():
     print("✅ SUCCESS: Complex Gantt Structure & Historical Data Loaded.")
 
 if __name__ == "__main__":
-    reset_sheets()
\ No newline at end of file
+    # python reset_data.py [sheets|sqlite]
+    reset_sheets(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+# CONFIG
+JOURNAL_PATH = os.environ.get("MC_JOURNAL_PATH", "mission_control.journal.jsonl")
+
+class RunJournal:
+    """
+    Append-only JSON-lines checkpoint of mission_control runs.
+    Each (Project ID, period) unit of a run gets an idempotency key and moves through
+    'generated' (model output saved here, with the log row) -> 'logged' (row flushed to AI_Analysis_Log).
+    A run that never reached 'run_complete' is resumed on the next start: logged units are skipped
+    and generated ones are re-queued from the journal, so no model call is repeated. Units carry the
+    fingerprint of the inputs they were built from; a unit whose inputs have changed since counts as not done.
+    Every record is fsync'ed before the call returns.
+    """
+    def __init__(self, path=JOURNAL_PATH, fresh=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.units = {}
+        self.run_id = None
+        self.resumed = False
+
+        runs = {}
+        last_open = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try: rec = json.loads(line)
+                    except ValueError: continue # Torn last line from a crash
+                    run = rec.get("run_id")
+                    event = rec.get("event")
+                    if event == "run_start":
+                        runs[run] = {}
+                        last_open = run
+                    elif event == "run_complete":
+                        runs.pop(run, None)
+                        if last_open == run: last_open = None
+                    elif run in runs:
+                        units = runs[run]
+                        if event == "generated":
+                            units[rec["key"]] = {"status": "generated", "row": rec["row"], "inputs": rec.get("inputs")}
+                        elif event == "logged" and rec["key"] in units: units[rec["key"]]["status"] = "logged"
+
+        if last_open and not fresh:
+            self.run_id, self.units, self.resumed = last_open, runs[last_open], True
+            self.file = open(path, "a", encoding="utf-8")
+        else:
+            # Completed (or abandoned) runs hold nothing worth keeping: start the file over
+            self.run_id = uuid.uuid4().hex[:12]
+            self.file = open(path, "w", encoding="utf-8")
+            self._write({"event": "run_start"})
+
+    def _write(self, rec):
+        rec = dict(rec, run_id=self.run_id, ts=time.time())
+        self.file.write(json.dumps(rec) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def key(self, pid, period):
+        """Idempotency key of one unit of work in this run."""
+        return hashlib.sha256(f"{self.run_id}\0{pid}\0{period}".encode("utf-8")).hexdigest()[:24]
+
+    def status(self, key, inputs=None):
+        """'generated' / 'logged', or None when the unit is unknown or was built from other inputs."""
+        with self.lock:
+            unit = self.units.get(key)
+            if unit is None or (inputs is not None and unit.get("inputs") != inputs): return None
+            return unit["status"]
+
+    def record_generated(self, key, row, inputs=None):
+        with self.lock:
+            self.units[key] = {"status": "generated", "row": list(row), "inputs": inputs}
+            self._write({"event": "generated", "key": key, "row": list(row), "inputs": inputs})
+
+    def mark_logged(self, keys):
+        with self.lock:
+            for key in keys:
+                unit = self.units.get(key)
+                if unit is None or unit["status"] == "logged": continue
+                unit["status"] = "logged"
+                self._write({"event": "logged", "key": key})
+
+    def pending_rows(self):
+        """(key, row, inputs) for units whose model output exists but never reached the sheet."""
+        with self.lock:
+            return [(k, u["row"], u.get("inputs")) for k, u in self.units.items() if u["status"] == "generated"]
+
+    def counts(self):
+        with self.lock:
+            statuses = [u["status"] for u in self.units.values()]
+            return {"generated": statuses.count("generated"), "logged": statuses.count("logged")}
+
+    def complete(self):
+        with self.lock:
+            self._write({"event": "run_complete"})
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,308 @@
+import re
+import heapq
+from collections import deque, namedtuple
+from datetime import date
+from functools import lru_cache
+
+Task = namedtuple("Task", ["id", "name", "status", "start", "end", "deps", "baseline_end"]) # start/end = day ordinals
+STARTED_STATUSES = ("done", "complete", "completed", "in progress") # Their start date is a fact, not a forecast
+KEEP = object() # update_task(): leave this field as it is (None clears a date)
+
+class ScheduleError(ValueError):
+    """A task network that cannot be scheduled (dependency cycle)."""
+
+@lru_cache(maxsize=8192)
+def parse_day(text):
+    """ISO date cell -> day ordinal, or None when blank / not a date."""
+    try: return date.fromisoformat(str(text).strip()).toordinal()
+    except ValueError: return None
+
+def format_day(day):
+    return date.fromordinal(day).isoformat() if day is not None else ""
+
+def parse_dependencies(cell):
+    """'1.1', '1.1, 1.2' or '1.1;1.2' -> ['1.1', '1.2']; '-' / blank -> []."""
+    text = str(cell or "").strip()
+    if not text or text == "-": return []
+    if "," not in text and ";" not in text: return [text]
+    return [d for d in (p.strip() for p in re.split(r"[,;]", text)) if d and d != "-"]
+
+class Schedule:
+    """
+    Critical Path Method over one project's task network (finish-to-start links, calendar days).
+    Tasks are sorted topologically once (Kahn, O(V+E)); early dates come from a forward pass and
+    late dates from a backward pass against the project finish. Tasks without predecessors and
+    tasks already started keep their (actual) start date; every other task starts the day after
+    its last predecessor finishes, so a slip or overrun pushes every successor. Negative float
+    marks work that is already behind its successors.
+    update_task() re-runs the forward pass only over the changed task's descendants and the
+    backward pass only over its ancestors (all tasks only when the project finish moves).
+    """
+    def __init__(self, tasks):
+        self.tasks = {}
+        for t in tasks: self.tasks[t.id] = t # Duplicate Task IDs: the last row wins
+        ids = list(self.tasks)
+        index = {tid: i for i, tid in enumerate(ids)}
+        n = len(ids)
+        self.ids = ids
+        self.index = index
+        self.unknown_dependencies = []
+        self.preds = [[] for _ in range(n)]
+        self.succs = [[] for _ in range(n)]
+        for i, tid in enumerate(ids):
+            for dep in self.tasks[tid].deps:
+                j = index.get(dep)
+                if j is None: self.unknown_dependencies.append((tid, dep)); continue
+                if j in self.preds[i]: continue
+                self.preds[i].append(j)
+                self.succs[j].append(i)
+
+        # Kahn's algorithm (FIFO: any topological order works, positions are derived from it)
+        indegree = [len(p) for p in self.preds]
+        ready = deque(i for i in range(n) if not indegree[i])
+        order = []
+        while ready:
+            i = ready.popleft()
+            order.append(i)
+            for s in self.succs[i]:
+                indegree[s] -= 1
+                if not indegree[s]: ready.append(s)
+        if len(order) < n:
+            stuck = [ids[i] for i in range(n) if indegree[i]]
+            raise ScheduleError(f"Dependency cycle among tasks: {', '.join(stuck)}")
+        self.order = order
+        self.pos = [0] * n
+        for p, i in enumerate(order): self.pos[i] = p
+
+        self.anchor = [None] * n
+        self.dur = [1] * n
+        for i, tid in enumerate(ids): self._set_dates(i, self.tasks[tid])
+        self.es, self.ef = [0] * n, [0] * n
+        self.ls, self.lf = [0] * n, [0] * n
+        self._forward()
+        self._backward()
+
+    def _set_dates(self, i, task):
+        start, end = task.start, task.end
+        started = not self.preds[i] or str(task.status).strip().lower() in STARTED_STATUSES
+        self.anchor[i] = start if started else None
+        self.dur[i] = max(1, end - start + 1) if start is not None and end is not None else 1
+
+    def _origin(self):
+        anchors = [a for a in self.anchor if a is not None]
+        if anchors: return min(anchors)
+        # No dated root (e.g. its forecast was cleared): start from the earliest date in the network
+        known = [d for t in self.tasks.values() for d in (t.start, t.end) if d is not None]
+        return min(known) if known else date.today().toordinal()
+
+    def _early(self, i, origin):
+        if self.anchor[i] is not None: return self.anchor[i]
+        if not self.preds[i]: return origin
+        return max(self.ef[p] for p in self.preds[i]) + 1
+
+    def _late(self, i):
+        lf = self.finish
+        for s in self.succs[i]: lf = min(lf, self.ls[s] - 1)
+        return lf
+
+    def _forward(self):
+        origin = self.origin = self._origin()
+        for i in self.order:
+            self.es[i] = self._early(i, origin)
+            self.ef[i] = self.es[i] + self.dur[i] - 1
+        self.finish = max(self.ef) if self.ef else 0
+
+    def _backward(self):
+        for i in reversed(self.order):
+            self.lf[i] = self._late(i)
+            self.ls[i] = self.lf[i] - self.dur[i] + 1
+
+    def update_task(self, task_id, start=KEEP, end=KEEP, status=KEEP):
+        """
+        New forecast dates (day ordinals, None = cleared) and/or status for one task. Fields left at KEEP
+        are unchanged. Returns the IDs of the tasks whose early or late dates moved; tasks outside the
+        changed task's cone are not visited.
+        """
+        i = self.index[task_id]
+        t = self.tasks[task_id]
+        t = self.tasks[task_id] = t._replace(start=t.start if start is KEEP else start,
+                                             end=t.end if end is KEEP else end,
+                                             status=t.status if status is KEEP else status)
+        self._set_dates(i, t)
+        moved = set()
+
+        origin = self._origin()
+        if origin != self.origin:
+            # The earliest anchor moved: unconstrained roots elsewhere shift too, so redo both passes
+            old = list(zip(self.es, self.ef, self.ls, self.lf))
+            self._forward()
+            self._backward()
+            return [self.ids[k] for k in self.order if (self.es[k], self.ef[k], self.ls[k], self.lf[k]) != old[k]]
+
+        # Forward pass over descendants, in topological order, stopping where nothing moves
+        heap = [(self.pos[i], i)]
+        queued = {i}
+        while heap:
+            _, k = heapq.heappop(heap)
+            es = self._early(k, origin)
+            ef = es + self.dur[k] - 1
+            if (es, ef) == (self.es[k], self.ef[k]) and k != i: continue
+            if (es, ef) != (self.es[k], self.ef[k]): moved.add(k)
+            self.es[k], self.ef[k] = es, ef
+            for s in self.succs[k]:
+                if s not in queued: queued.add(s); heapq.heappush(heap, (self.pos[s], s))
+
+        finish = max(self.ef)
+        if finish != self.finish:
+            self.finish = finish
+            old = list(zip(self.ls, self.lf))
+            self._backward()
+            moved.update(k for k in range(len(self.ids)) if (self.ls[k], self.lf[k]) != old[k])
+        else:
+            # Backward pass over ancestors, in reverse topological order
+            heap = [(-self.pos[i], i)]
+            queued = {i}
+            while heap:
+                _, k = heapq.heappop(heap)
+                lf = self._late(k)
+                ls = lf - self.dur[k] + 1
+                if (ls, lf) == (self.ls[k], self.lf[k]) and k != i: continue
+                if (ls, lf) != (self.ls[k], self.lf[k]): moved.add(k)
+                self.ls[k], self.lf[k] = ls, lf
+                for p in self.preds[k]:
+                    if p not in queued: queued.add(p); heapq.heappush(heap, (-self.pos[p], p))
+        return [self.ids[k] for k in sorted(moved, key=self.pos.__getitem__)]
+
+    def total_float(self, task_id):
+        i = self.index[task_id]
+        return self.ls[i] - self.es[i]
+
+    def dates(self, task_id):
+        """Early/late start and finish as ISO dates, plus total float in days."""
+        i = self.index[task_id]
+        return {"early_start": format_day(self.es[i]), "early_finish": format_day(self.ef[i]),
+                "late_start": format_day(self.ls[i]), "late_finish": format_day(self.lf[i]),
+                "float": self.ls[i] - self.es[i]}
+
+    def critical_tasks(self):
+        """Every task with zero (or negative) float, in topological order."""
+        return [self.ids[i] for i in self.order if self.ls[i] <= self.es[i]]
+
+    def critical_path(self):
+        """The driving chain of critical tasks that ends at the project finish."""
+        ends = [i for i in self.order if self.ef[i] == self.finish and self.ls[i] <= self.es[i]]
+        if not ends: return []
+        path = [ends[0]]
+        while True:
+            k = path[-1]
+            driving = [p for p in self.preds[k] if self.ef[p] + 1 >= self.es[k] and self.ls[p] <= self.es[p]]
+            if not driving: break
+            path.append(min(driving, key=lambda p: (-self.ef[p], self.pos[p])))
+        return [self.ids[i] for i in reversed(path)]
+
+    def baseline_finish(self):
+        ends = [t.baseline_end for t in self.tasks.values() if t.baseline_end is not None]
+        return max(ends) if ends else None
+
+def tasks_from_rows(rows, cols):
+    """Schedule_Gantt rows -> Task tuples (forecast dates, falling back to the baseline)."""
+    c = cols
+    idx_bs, idx_be = c.get("Baseline Start"), c.get("Baseline End")
+    idx_fs, idx_fe = c.get("Forecast Start"), c.get("Forecast End")
+    idx_name, idx_status, idx_dep = c.get("Task Name"), c.get("Status"), c.get("Dependency")
+
+    def day(r, idx):
+        return parse_day(r[idx]) if idx is not None and idx < len(r) else None
+
+    def cell(r, idx):
+        return r[idx] if idx is not None and idx < len(r) else ""
+
+    for r in rows:
+        start = day(r, idx_fs)
+        end = day(r, idx_fe)
+        yield Task(r[c["Task ID"]], cell(r, idx_name), cell(r, idx_status),
+                   start if start is not None else day(r, idx_bs),
+                   end if end is not None else day(r, idx_be),
+                   tuple(parse_dependencies(cell(r, idx_dep))), day(r, idx_be))
+
+class ScheduleIndex:
+    """
+    A Schedule per (Project ID, Report Period) of a Schedule_Gantt tab.
+    refresh() takes a new read of the tab and diffs it against the last one: projects whose
+    task list or dependencies changed are rebuilt, forecast-date edits go through
+    Schedule.update_task, and untouched projects are not recomputed at all.
+    """
+    def __init__(self, rows=None):
+        self.cols = {}
+        self.schedules = {}
+        self.tasks = {}   # (pid, period) -> {task_id: Task}
+        self.raw = {}     # (pid, period) -> the rows it was built from
+        self.errors = {}  # (pid, period) -> message
+        self.latest = {}  # pid -> latest period
+        if rows: self.refresh(rows)
+
+    def refresh(self, rows):
+        """Applies a full read of the tab (header row first). Returns what had to be recomputed."""
+        it = iter(rows)
+        header = next(it, None)
+        stats = {"rebuilt": 0, "updated_tasks": 0, "moved_tasks": 0, "unchanged": 0}
+        if not header: return stats
+        if header != list(self.cols):
+            self.schedules, self.tasks, self.raw, self.errors = {}, {}, {}, {}
+        c = self.cols = {h: i for i, h in enumerate(header)}
+        if "Project ID" not in c or "Report Period" not in c or "Task ID" not in c: return stats
+
+        idx_id, idx_period = c["Project ID"], c["Report Period"]
+        groups = {}
+        for r in it:
+            if len(r) <= max(idx_id, idx_period, c["Task ID"]) or not r[c["Task ID"]]: continue
+            groups.setdefault((r[idx_id], r[idx_period]), []).append(r)
+
+        latest = {}
+        for key, group in groups.items():
+            pid, period = key
+            if pid not in latest or period > latest[pid]: latest[pid] = period
+            if self.raw.get(key) == group:
+                stats["unchanged"] += 1
+                continue
+            self.raw[key] = [list(r) for r in group] # Copies: callers may edit their rows in place
+            tasks = {t.id: t for t in tasks_from_rows(group, c)}
+            old = self.tasks.get(key)
+            self.tasks[key] = tasks
+            schedule = self.schedules.get(key)
+
+            same_network = (schedule is not None and old is not None and old.keys() == tasks.keys()
+                            and all(old[tid].deps == t.deps for tid, t in tasks.items()))
+            if not same_network:
+                self._build(key, tasks)
+                stats["rebuilt"] += 1
+                continue
+
+            scheduling = lambda t: (t.start, t.end, t.status)
+            changed = [t for tid, t in tasks.items() if scheduling(old[tid]) != scheduling(t)]
+            for tid, t in tasks.items():
+                if old[tid] != t and scheduling(old[tid]) == scheduling(t):
+                    schedule.tasks[tid] = t # Name / baseline only: no date math
+            for t in changed:
+                stats["moved_tasks"] += len(schedule.update_task(t.id, t.start, t.end, t.status))
+                schedule.tasks[t.id] = t
+            stats["updated_tasks"] += len(changed)
+            if not changed: stats["unchanged"] += 1
+
+        for key in set(self.tasks) - set(groups):
+            for d in (self.tasks, self.raw, self.schedules, self.errors): d.pop(key, None)
+        self.latest = latest
+        return stats
+
+    def _build(self, key, tasks):
+        try:
+            self.schedules[key] = Schedule(tasks.values())
+            self.errors.pop(key, None)
+        except ScheduleError as e:
+            self.schedules.pop(key, None)
+            self.errors[key] = str(e)
+
+    def get(self, project_id, period=None):
+        """The project's schedule for `period` (default: its latest period), or None."""
+        period = period or self.latest.get(project_id)
+        return self.schedules.get((project_id, period))
@@ -0,0 +1,66 @@
+import time
+import threading
+from gspread.utils import rowcol_to_a1
+import stage_metrics
+
+class BufferedSheetWriter:
+    """
+    Write-behind buffer for a gspread Worksheet.
+    Drop-in for `append_row` / `update_cell`: calls are queued and sent as one
+    `batch_update` + one `append_rows` per flush instead of one API round trip each.
+    Thread-safe, so concurrent project workers can share one writer.
+    `on_flush(rows, cells)` is called after each successful batch (e.g. to checkpoint what reached the sheet).
+    """
+    def __init__(self, worksheet, max_pending=50, max_retries=3, backoff_seconds=2.0, on_flush=None):
+        self.worksheet = worksheet
+        self.on_flush = on_flush
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.pending_rows = []
+        self.pending_cells = []
+        self.lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+    def append_row(self, values):
+        with self.lock:
+            self.pending_rows.append(list(values))
+            self._maybe_flush()
+
+    def update_cell(self, row, col, value):
+        with self.lock:
+            self.pending_cells.append({"range": rowcol_to_a1(row, col), "values": [[value]]})
+            self._maybe_flush()
+
+    def pending(self):
+        return len(self.pending_rows) + len(self.pending_cells)
+
+    def _maybe_flush(self):
+        if self.pending() >= self.max_pending: self.flush()
+
+    def flush(self):
+        """Sends everything queued. On failure the WHOLE batch is retried with exponential backoff."""
+        with self.lock:
+            if not self.pending(): return
+            cells, rows = self.pending_cells, self.pending_rows
+
+            with stage_metrics.span("sheets_write"):
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        # Cell updates first: they target existing rows, appends only grow the sheet
+                        if cells: self.worksheet.batch_update(cells, raw=False)
+                        if rows: self.worksheet.append_rows(rows)
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries: raise
+                        wait = self.backoff_seconds * (2 ** attempt)
+                        print(f"      ⚠️ Sheet batch write failed ({e}). Retrying in {wait:.0f}s...")
+                        time.sleep(wait)
+
+            self.pending_cells, self.pending_rows = [], []
+            if self.on_flush: self.on_flush(rows, cells)
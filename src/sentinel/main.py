@@ -2,10 +2,12 @@ import functions_framework
 import os
 import json
 import logging
-import requests
-import google.auth
-import gspread
-from google.cloud import pubsub_v1
+import hashlib
+import heapq
+import threading
+# google.auth / gspread, pubsub_v1 and agent_http (requests) are imported on first use, not per cold start
+import data_store # Sheets or local SQLite backend (MC_DATA_STORE)
+import stage_metrics # Span timings + counters, scraped from /metrics on METRICS_PORT
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,103 +16,250 @@ PROJECT_ID = os.environ.get("PROJECT_ID", "local-test")
 TOPIC_NAME = os.environ.get("PUBSUB_TOPIC", "risk-events")
 CPI_THRESHOLD = float(os.environ.get("CPI_THRESHOLD", 0.9))
 STRATEGIST_URL = os.environ.get("STRATEGIST_URL", "http://strategist:8081")
+TOP_K = int(os.environ.get("BREACH_TOP_K", 0)) # 0 = report every breach
+BATCH_MAX_ITEMS = int(os.environ.get("STRATEGIST_BATCH_MAX_ITEMS", 200)) # Alerts per POST /batch (the Strategist's cap)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9091)) # 0 = no /metrics server
+PREWARM = os.environ.get("PREWARM", "0") == "1" # Authorize + build clients in the background at instance start
 
 # Sheets Config (No more CPI_CELL)
 SHEET_NAME = os.environ.get("SHEET_NAME", "Project_Alpha_Master")
 TAB_NAME = os.environ.get("TAB_NAME", "Budget_Tracking")
+CPI_COLUMNS = ("CPI (EV/AC)", "CPI") # Budget_Tracking's ratio column; older sheets name it plain "CPI"
 
-def find_critical_tasks():
-    """
-    Scans the entire Budget_Tracking sheet.
-    Returns the task with the LOWEST CPI if it is below the threshold.
-    """
-    try:
-        # 1. Authenticate & Open
+# --- WARM STATE (reused across invocations on the same instance) ---
+_worksheet = None
+_publisher = None
+_scan_state = {"last_update": None, "sheet_fingerprint": None, "headers": None, "rows": {}, "result": []}
+
+# functions-framework owns the main port, so /metrics is served from a side thread
+if METRICS_PORT:
+    try: stage_metrics.start_http_server(METRICS_PORT)
+    except OSError as e: logging.warning(f"Metrics server not started on :{METRICS_PORT}: {e}")
+
+def get_worksheet():
+    """Authorizes once and keeps the worksheet handle for later events."""
+    global _worksheet
+    if _worksheet is None and data_store.DATA_STORE == "sqlite":
+        _worksheet = data_store.SQLiteStore().worksheet(TAB_NAME)
+    if _worksheet is None:
+        import google.auth
+        import gspread
         scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
         creds, _ = google.auth.default(scopes=scopes)
         client = gspread.authorize(creds)
-        sheet = client.open(SHEET_NAME).worksheet(TAB_NAME)
+        _worksheet = client.open(SHEET_NAME).worksheet(TAB_NAME)
+    return _worksheet
 
-        # 2. Fetch All Data (Returns a list of dictionaries)
-        # Expected Headers: ['Cost Category', 'Budget (BAC)', 'Earned (EV)', 'Actual (AC)', 'CPI']
-        all_records = sheet.get_all_records()
-        
-        logging.info(f"Scanned {len(all_records)} project rows.")
+def get_publisher():
+    """One long-lived publisher; messages from a scan are batched into few publish RPCs."""
+    global _publisher
+    if _publisher is None:
+        from google.cloud import pubsub_v1
+        batch_settings = pubsub_v1.types.BatchSettings(max_messages=100, max_bytes=1024 * 1024, max_latency=0.05)
+        _publisher = pubsub_v1.PublisherClient(batch_settings)
+    return _publisher
+
+def is_local():
+    return PROJECT_ID == "local-test" or PROJECT_ID == "pm-mission-control"
+
+def prewarm():
+    """Runs the first-event setup (SDK imports, auth, clients) ahead of time; failures are retried on the event."""
+    global _worksheet
+    with stage_metrics.span("prewarm"):
+        try:
+            get_worksheet()
+            if is_local(): import agent_http
+            else: get_publisher()
+        except Exception as e:
+            logging.warning(f"Pre-warm failed (will retry on first event): {e}")
+            _worksheet = None
+
+def _row_fingerprint(row):
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=16).digest()
+
+def _evaluate_row(record):
+    """Returns the breach dict for one row, or None if it is healthy / not a CPI row."""
+    task_name = record.get("Cost Category", "Unknown Task")
+    raw_cpi = next((record[c] for c in CPI_COLUMNS if c in record), None)
+
+    # Skip header rows or empty lines
+    if raw_cpi == "" or raw_cpi is None:
+        return None
 
-        critical_task = None
-        min_cpi = 100.0 # Start high
+    try:
+        cpi_value = float(raw_cpi)
+    except ValueError:
+        return None # Skip if CPI is text
+
+    logging.info(f"Analyzing {task_name}: CPI={cpi_value}")
+    if cpi_value < CPI_THRESHOLD:
+        return {
+            "project_id": record.get("Project ID", "UNKNOWN"),
+            "period": record.get("Report Period"),
+            "task_name": task_name,
+            "cpi": cpi_value,
+            "budget": record.get("Budget (BAC)")
+        }
+    return None
+
+def scan_breaches():
+    """
+    Scans the entire Budget_Tracking sheet.
+    Returns EVERY row below the threshold, in sheet order.
+    Only rows whose content changed since the last scan are re-evaluated;
+    an unchanged sheet returns the previous result straight away.
+    """
+    global _worksheet
+    state = _scan_state
+    try:
+        # 1. Reuse the authorized handle
+        with stage_metrics.span("auth"): sheet = get_worksheet()
 
-        # 3. Analyze Each Row
-        for row in all_records:
-            task_name = row.get("Cost Category", "Unknown Task")
-            raw_cpi = row.get("CPI")
+        # 2. Cheap metadata check before pulling the whole tab
+        with stage_metrics.span("sheets_metadata"):
+            try: last_update = sheet.spreadsheet.get_lastUpdateTime()
+            except Exception: last_update = None
+        if last_update and last_update == state["last_update"]:
+            logging.info("Sheet unchanged since last scan (modifiedTime). Skipping.")
+            stage_metrics.inc("scan_cache_hits_total", reason="modified_time")
+            return state["result"]
 
-            # Skip header rows or empty lines
-            if raw_cpi == "" or raw_cpi is None:
-                continue
+        # 3. Fetch All Data
+        # Expected Headers: ['Project ID', ..., 'Cost Category', 'Budget (BAC)', ..., 'CPI (EV/AC)']
+        with stage_metrics.span("sheets_read"): values = sheet.get_all_values()
+        headers, rows = (values[0], values[1:]) if values else ([], [])
+        if headers != state["headers"]:
+            state["rows"] = {} # Column layout changed: every cached evaluation is stale
 
-            try:
-                cpi_value = float(raw_cpi)
-            except ValueError:
-                continue # Skip if CPI is text
+        fingerprints = [_row_fingerprint(r) for r in rows]
+        sheet_fingerprint = hashlib.blake2b(b"".join(fingerprints), digest_size=16).digest()
+        if headers == state["headers"] and sheet_fingerprint == state["sheet_fingerprint"]:
+            state["last_update"] = last_update
+            logging.info(f"Scanned {len(rows)} project rows. No changes.")
+            stage_metrics.inc("scan_cache_hits_total", reason="fingerprint")
+            return state["result"]
 
-            logging.info(f"Analyzing {task_name}: CPI={cpi_value}")
+        # 4. Analyze Only Changed Rows (evaluations are keyed by row content)
+        previous = state["rows"]
+        current = {}
+        breaches = []
+        changed = 0
 
-            # Logic: Track the 'worst' CPI that is below threshold
-            if cpi_value < CPI_THRESHOLD:
-                if cpi_value < min_cpi:
-                    min_cpi = cpi_value
-                    critical_task = {
-                        "task_name": task_name,
-                        "cpi": cpi_value,
-                        "budget": row.get("Budget (BAC)")
-                    }
+        with stage_metrics.span("evaluate"):
+            for fp, r in zip(fingerprints, rows):
+                if fp in current:
+                    result = current[fp]
+                elif fp in previous:
+                    result = previous[fp]
+                else:
+                    result = _evaluate_row(dict(zip(headers, r)))
+                    changed += 1
+                current[fp] = result
+                if result: breaches.append(result)
 
-        return critical_task
+        stage_metrics.inc("rows_evaluated_total", changed)
+        logging.info(f"Scanned {len(rows)} project rows ({changed} changed).")
+        state.update(last_update=last_update, sheet_fingerprint=sheet_fingerprint,
+                     headers=headers, rows=current, result=breaches)
+        return breaches
 
     except Exception as e:
         logging.error(f"Failed to scan Google Sheet: {e}")
-        return None
+        stage_metrics.inc("errors_total", stage="scan")
+        _worksheet = None # Re-authorize on the next event
+        return []
+
+def rank_breaches(breaches, top_k=TOP_K):
+    """Lowest CPI first (ties keep sheet order). With top_k, a heap keeps only the K worst."""
+    keyed = ((b["cpi"], i, b) for i, b in enumerate(breaches))
+    ranked = heapq.nsmallest(top_k, keyed) if top_k else sorted(keyed)
+    return [b for _, _, b in ranked]
+
+def group_breaches(ranked):
+    """Groups ranked breaches per project; projects are ordered by their worst breach."""
+    groups = {}
+    for b in ranked:
+        g = groups.setdefault(b["project_id"], {"project_id": b["project_id"], "worst_cpi": b["cpi"], "breaches": []})
+        g["breaches"].append(b)
+    return list(groups.values())
+
+def find_critical_tasks():
+    """Returns the task with the LOWEST CPI if it is below the threshold."""
+    worst = rank_breaches(scan_breaches(), top_k=1)
+    return worst[0] if worst else None
 
 @functions_framework.cloud_event
 def analyze_event(cloud_event):
+    with stage_metrics.span("event"):
+        _analyze_event(cloud_event)
+
+def _analyze_event(cloud_event):
     try:
         logging.info(f"Event Received: {cloud_event['id']}")
         
-        # --- 1. SENSE (Dynamic Scanning) ---
+        # --- 1. SENSE (Dynamic Scanning: every breach in one pass) ---
         logging.info("Scanning project for critical risks...")
-        worst_offender = find_critical_tasks()
+        with stage_metrics.span("scan"): ranked = rank_breaches(scan_breaches())
+        stage_metrics.inc("breaches_total", len(ranked))
 
-        if worst_offender:
-            current_cpi = worst_offender['cpi']
-            task_name = worst_offender['task_name']
-            
-            logging.warning(f"CRITICAL BREACH FOUND: {task_name} (CPI {current_cpi})")
+        if ranked:
+            projects = group_breaches(ranked)
+            worst_offender = ranked[0]
+            logging.warning(
+                f"{len(ranked)} CRITICAL BREACHES across {len(projects)} projects. "
+                f"Worst: {worst_offender['task_name']} (CPI {worst_offender['cpi']})"
+            )
 
             # --- 2. THINK (Prepare Context) ---
-            risk_payload = {
-                "event_id": cloud_event["id"],
-                "alert_type": "CPI_BREACH",
-                "details": { 
-                    "current_value": current_cpi, 
-                    "threshold": CPI_THRESHOLD,
-                    "failing_task": task_name, # Identifying WHO is failing
-                    "source": f"Sheet: {SHEET_NAME}"
+            def make_payload(alert_type, worst, **extra):
+                return {
+                    "event_id": cloud_event["id"],
+                    "alert_type": alert_type,
+                    "details": { 
+                        "current_value": worst["cpi"], 
+                        "threshold": CPI_THRESHOLD,
+                        "failing_task": worst["task_name"], # Identifying WHO is failing
+                        "source": f"Sheet: {SHEET_NAME}"
+                    },
+                    **extra
                 }
-            }
 
             # --- 3. ACT (Trigger Strategist) ---
-            if PROJECT_ID == "local-test" or PROJECT_ID == "pm-mission-control":
-                logging.info(f"[LOCAL] Triggering Strategist for {task_name}...")
-                requests.post(STRATEGIST_URL, json=risk_payload)
+            # One alert per project (its worst breach in 'details'), as on the Pub/Sub path
+            alerts = [make_payload("CPI_BREACH", group["breaches"][0], project_id=group["project_id"],
+                                   period=group["breaches"][0]["period"], breaches=group["breaches"])
+                      for group in projects]
+            if is_local():
+                import agent_http # Shared pooled client (timeouts + retries)
+                # POST /batch: the Strategist answers every project's alert concurrently, in as few requests as the cap allows
+                logging.info(f"[LOCAL] Triggering Strategist for {len(projects)} projects...")
+                url = STRATEGIST_URL.rstrip("/") + "/batch"
+                size = max(1, BATCH_MAX_ITEMS)
+                with stage_metrics.span("strategist_call"):
+                    for k in range(0, len(alerts), size):
+                        resp = agent_http.post(url, json=alerts[k:k + size])
+                        if resp.status_code != 200:
+                            logging.error(f"Strategist /batch returned {resp.status_code}")
+                            stage_metrics.inc("errors_total", stage="strategist_call")
+                            continue
+                        failed = [r.get("error") for r in resp.json() if "error" in r]
+                        if failed:
+                            logging.error(f"{len(failed)} alerts failed in the Strategist: {failed[0]}")
+                            stage_metrics.inc("errors_total", len(failed), stage="strategist_call")
             else:
-                publisher = pubsub_v1.PublisherClient()
+                # One message per project, batched by the long-lived publisher
+                publisher = get_publisher()
                 topic_path = publisher.topic_path(PROJECT_ID, TOPIC_NAME)
-                data_str = json.dumps(risk_payload).encode("utf-8")
-                publisher.publish(topic_path, data_str)
+                futures = [publisher.publish(topic_path, json.dumps(payload).encode("utf-8")) for payload in alerts]
+                with stage_metrics.span("publish"):
+                    for f in futures: f.result() # Flush before the instance can be frozen
+                logging.info(f"Published {len(futures)} project alerts.")
         else:
             logging.info("Scan complete. All tasks are healthy.")
                 
     except Exception as e:
         logging.error(f"Error in Sentinel Agent: {e}")
-        raise e
\ No newline at end of file
+        raise e
+
+if PREWARM:
+    threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
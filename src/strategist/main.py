@@ -1,9 +1,17 @@
 import os
+import json
+import time
 import logging
-from flask import Flask, request, jsonify
-import vertexai
-from vertexai.generative_models import GenerativeModel
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from datetime import datetime
+from strategy_cache import StrategyCache
+from singleflight import SingleFlight
+from schedule_engine import ScheduleIndex, format_day
+from strategy_log import StrategyLog
+import data_store # Sheets or local SQLite backend (MC_DATA_STORE)
+import stage_metrics
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -11,40 +19,170 @@ logging.basicConfig(level=logging.INFO)
 # Configuration
 PROJECT_ID = os.environ.get("PROJECT_ID", "your-project-id")
 LOCATION = os.environ.get("REGION", "us-central1")
+MODEL_NAME = os.environ.get("MODEL_NAME", "gemini-2.5-flash") # Or "gemini-1.0-pro"
+SHEET_NAME = os.environ.get("SHEET_NAME", "Project_Alpha_Master")
+SCHEDULE_TAB = os.environ.get("SCHEDULE_TAB", "Schedule_Gantt")
+SCHEDULE_RETRY_S = float(os.environ.get("SCHEDULE_RETRY_S", 60)) # Back-off after the schedule tab could not be read
+SCHEDULE_CHECK_S = float(os.environ.get("SCHEDULE_CHECK_S", 5))  # Min seconds between sheet freshness checks (Drive calls)
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))      # Model calls in flight across all /batch requests
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 200))
+BATCH_PACK_SIZE = int(os.environ.get("BATCH_PACK_SIZE", 0))          # >1: up to N small prompts share one generation
+BATCH_PACK_MAX_CHARS = int(os.environ.get("BATCH_PACK_MAX_CHARS", 4000)) # Only prompts this short are packed
+PREWARM = os.environ.get("PREWARM", "0") == "1" # Build the model client in the background right after startup
+MOCK_LLM = os.environ.get("MOCK_LLM", "0") == "1" # Offline model stand-in (mock_llm.py, MOCK_LLM_* settings) instead of Vertex AI
+STRATEGY_LOG_DIR = os.environ.get("STRATEGY_LOG_DIR", "strategy_log") # Every served strategy is archived here ("" disables)
 
-# Initialize Vertex AI (Only if not in mock mode)
-try:
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    model = GenerativeModel("gemini-2.5-flash") # Or "gemini-1.0-pro"
-    AI_ENABLED = True
-except Exception as e:
-    logging.warning(f"Vertex AI could not initialize (Auth missing?): {e}")
-    AI_ENABLED = False
+# --- WARM STATE (built on first use, reused for the life of the instance) ---
+# Importing the Vertex SDK takes seconds: it is deferred so cold starts (and /metrics, /stats) do not pay for it
+_model = None
+_model_lock = threading.Lock()
+AI_ENABLED = True # Flips to False (mock mode) if Vertex AI cannot initialize
 
-@app.route("/", methods=["POST"])
-def strategize():
+# Repeated alerts (same rendered prompt + model) are answered from cache
+strategy_cache = StrategyCache()
+# Identical alerts arriving together (event storms) share ONE in-flight generation
+inflight = SingleFlight()
+# Critical-path schedules of every project; only what changed in the tab is recomputed on refresh
+schedules = ScheduleIndex()
+_schedule_state = {"worksheet": None, "last_update": None, "failed_at": None, "checked_at": None}
+_schedule_lock = threading.Lock()
+# Bounded pool for /batch: caps concurrent model calls against the quota, whatever the batch size
+batch_pool = ThreadPoolExecutor(max_workers=max(1, BATCH_CONCURRENCY), thread_name_prefix="batch")
+# Indexed, compressed archive of served strategies (replaces mission_log.csv)
+strategy_log = StrategyLog(STRATEGY_LOG_DIR) if STRATEGY_LOG_DIR else None
+
+def get_model():
+    """Imports Vertex AI and builds the GenerativeModel once; None in mock mode."""
+    global _model, AI_ENABLED
+    if _model is not None or not AI_ENABLED: return _model
+    with _model_lock:
+        if _model is None and AI_ENABLED:
+            try:
+                with stage_metrics.span("model_init"):
+                    if MOCK_LLM:
+                        from mock_llm import MockGenerativeModel
+                        _model = MockGenerativeModel()
+                    else:
+                        import vertexai
+                        from vertexai.generative_models import GenerativeModel
+                        vertexai.init(project=PROJECT_ID, location=LOCATION)
+                        _model = GenerativeModel(MODEL_NAME)
+            except Exception as e:
+                logging.warning(f"Vertex AI could not initialize (Auth missing?): {e}")
+                AI_ENABLED = False
+    return _model
+
+def prewarm():
+    """Pays the cold-start costs (SDK import, client, schedules) before the first alert arrives."""
+    with stage_metrics.span("prewarm"):
+        get_model()
+        refresh_schedules()
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Streaming responses are timed to the first byte here; their generation is timed in the 'llm' stage
+    if request.path != "/metrics":
+        elapsed = time.perf_counter() - g.get("started", time.perf_counter())
+        stage_metrics.registry.observe("request_seconds", elapsed, route=request.path)
+        if response.status_code >= 500: stage_metrics.inc("errors_total", stage="request", route=request.path)
+    return response
+
+def record_usage(usage):
+    """Token counts reported by Vertex (usage_metadata), when present."""
+    if usage is None: return
+    stage_metrics.inc("llm_tokens_total", getattr(usage, "prompt_token_count", 0) or 0, kind="prompt")
+    stage_metrics.inc("llm_tokens_total", getattr(usage, "candidates_token_count", 0) or 0, kind="completion")
+
+def cached_advice(cache_key):
+    with stage_metrics.span("cache_lookup"): advice = strategy_cache.get(cache_key)
+    stage_metrics.inc("cache_hits_total" if advice is not None else "cache_misses_total")
+    return advice
+
+def get_schedule_worksheet():
+    """Authorizes once and keeps the Schedule_Gantt handle for later requests."""
+    state = _schedule_state
+    if state["worksheet"] is None and data_store.DATA_STORE == "sqlite":
+        state["worksheet"] = data_store.SQLiteStore().worksheet(SCHEDULE_TAB)
+    if state["worksheet"] is None:
+        import google.auth
+        import gspread
+        scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+        creds, _ = google.auth.default(scopes=scopes)
+        state["worksheet"] = gspread.authorize(creds).open(SHEET_NAME).worksheet(SCHEDULE_TAB)
+    return state["worksheet"]
+
+def refresh_schedules():
     """
-    Receives a Risk Alert and generates a Recovery Plan.
+    Re-reads Schedule_Gantt when the sheet changed; ScheduleIndex recomputes only the moved tasks.
+    Called once per request, and the freshness check itself (a Drive metadata call) runs at most
+    once per SCHEDULE_CHECK_S: requests arriving meanwhile use the schedules as they are.
     """
-    data = request.json
-    logging.info(f"Strategist received alert: {data}")
+    state = _schedule_state
+    recent = lambda: state["checked_at"] is not None and time.monotonic() - state["checked_at"] < SCHEDULE_CHECK_S
+    if recent(): return
+    with _schedule_lock:
+        if recent(): return
+        if state["failed_at"] and time.monotonic() - state["failed_at"] < SCHEDULE_RETRY_S: return
+        state["checked_at"] = time.monotonic()
+        try:
+            sheet = get_schedule_worksheet()
+            try: last_update = sheet.spreadsheet.get_lastUpdateTime()
+            except Exception: last_update = None
+            if last_update and last_update == state["last_update"]: return
+            with stage_metrics.span("schedule_refresh"): stats = schedules.refresh(sheet.get_all_values())
+            for name, value in stats.items(): stage_metrics.inc("schedule_refresh_total", value, result=name)
+            state.update(last_update=last_update, failed_at=None)
+        except Exception as e:
+            logging.warning(f"Schedule_Gantt unavailable, prompting without it: {e}")
+            stage_metrics.inc("errors_total", stage="schedule")
+            state.update(worksheet=None, failed_at=time.monotonic())
+
+def alert_project(data):
+    """Project ID of an alert: per-project alerts carry it, batch alerts lead with the worst project."""
+    if data.get("project_id"): return data["project_id"]
+    projects = data.get("projects") or []
+    return projects[0].get("project_id") if projects else None
 
+def schedule_context(project_id):
+    """Schedule lines for the prompt, from the project's critical-path analysis."""
+    schedule = schedules.get(project_id) if project_id else None
+    if schedule is None: return ["- Schedule: not available for this project"]
+
+    tasks = schedule.tasks
+    is_open = lambda tid: str(tasks[tid].status).strip().lower() not in ("done", "complete", "completed")
+    path = schedule.critical_path()
+    remaining = [tid for tid in path if is_open(tid)]
+    open_tasks = sorted((tid for tid in schedule.ids if is_open(tid)), key=lambda tid: schedule.dates(tid)["early_start"])
+    phase = remaining[0] if remaining else (open_tasks[0] if open_tasks else None)
+
+    lines = [f"- Current Phase: {tasks[phase].name if phase else 'Complete'}"]
+    baseline = schedule.baseline_finish()
+    if baseline is not None:
+        lines.append(f"- Schedule Slack: {baseline - schedule.finish} days to the baseline finish "
+                     f"({format_day(baseline)}; forecast {format_day(schedule.finish)})")
+    lines.append(f"- Critical Path: {' -> '.join(tasks[tid].name for tid in (remaining or path)) or 'n/a'}")
+    near = sorted((schedule.total_float(tid), tasks[tid].name) for tid in open_tasks if tid not in path)[:3]
+    if near: lines.append(f"- Lowest Float Off The Critical Path: {', '.join(f'{name} ({f} days)' for f, name in near)}")
+    return lines
+
+def build_prompt(data):
+    """Returns (cpi, prompt) for one Risk Alert."""
     # 1. Extract Context (The "Observation" step)
     cpi = data.get("details", {}).get("current_value", 0.0)
     
-    # 2. Mock Tool Use: Fetching Schedule Constraints
-    # In production, this would query Google Sheets/Jira API
+    # 2. Tool Use: Critical Path Method over the project's Schedule_Gantt task network (refresh_schedules() first)
+    schedule_lines = "\n    ".join(schedule_context(alert_project(data)))
     project_context = f"""
     Project Status:
-    - Current Phase: Foundation Pouring
     - CPI: {cpi} (Budget Overrun)
-    - Schedule Slack: 2 days
-    - Critical Path: Excavation -> Foundation -> Steel Framing
+    {schedule_lines}
     """
 
-    # 3. Reasoning (The "Thinking" step)
-    if AI_ENABLED:
-        prompt = f"""
+    prompt = f"""
         You are a Senior Project Manager. Analyze this situation and propose a recovery plan.
         
         CONTEXT:
@@ -53,23 +191,294 @@ def strategize():
         TASK:
         Provide a concise strategy to recover costs without delaying the Critical Path.
         """
-        
-        response = model.generate_content(prompt)
-        advice = response.text
-    else:
-        advice = "[MOCK] Vertex AI disabled. Strategy: Cut costs on non-critical tasks."
+    return cpi, prompt
 
-    # 4. Return the Artifact
-    artifact = {
+def generate(prompt, cache_key):
+    with stage_metrics.span("llm"): response = get_model().generate_content(prompt)
+    record_usage(getattr(response, "usage_metadata", None))
+    advice = response.text
+    strategy_cache.put(cache_key, MODEL_NAME, advice)
+    return advice
+
+def pack_prompts(prompts):
+    """One multi-part prompt for several independent requests, answered as JSON keyed by request id."""
+    parts = [f"### REQUEST {i + 1}\n{p.strip()}" for i, p in enumerate(prompts)]
+    return (
+        f"You will answer {len(prompts)} independent requests. Answer each one separately and completely,\n"
+        "as if it were the only request. Respond with JSON only, in this shape:\n"
+        '{"results": [{"id": <request number>, "content": "<answer to that request>"}]}\n\n'
+        + "\n\n".join(parts)
+    )
+
+def unpack_results(text, count):
+    """Answers of a packed generation in request order; None where one is missing or unreadable."""
+    try: results = json.loads(text).get("results", [])
+    except (ValueError, AttributeError): return [None] * count
+    by_id = {}
+    for r in results if isinstance(results, list) else []:
+        try: by_id[int(r["id"])] = str(r["content"])
+        except (KeyError, TypeError, ValueError): continue
+    return [by_id.get(i + 1) or None for i in range(count)]
+
+def generate_packed(prompts, cache_keys):
+    """
+    Several prompts in ONE generation. Returns one answer per prompt; the ones the model
+    dropped (or a reply that is not valid JSON) are generated on their own.
+    """
+    with stage_metrics.span("llm", mode="packed"):
+        response = get_model().generate_content(pack_prompts(prompts), generation_config={"response_mime_type": "application/json"})
+    record_usage(getattr(response, "usage_metadata", None))
+    answers = unpack_results(response.text, len(prompts))
+    stage_metrics.inc("batch_pack_misses_total", answers.count(None))
+    for i, (prompt, cache_key) in enumerate(zip(prompts, cache_keys)):
+        if answers[i] is None: answers[i] = generate(prompt, cache_key)
+        else: strategy_cache.put(cache_key, MODEL_NAME, answers[i])
+    return answers
+
+def make_artifact(cpi, advice, cache_hit, coalesced=False):
+    return {
         "strategy_id": "plan-alpha-1",
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), # <--- ADD THIS
         "target_audience": "Project Manager",
         "content": advice,
-        "input_cpi": cpi # <--- GOOD PRACTICE: Return the input data too
+        "input_cpi": cpi, # <--- GOOD PRACTICE: Return the input data too
+        "cache_hit": cache_hit,
+        "coalesced": coalesced
     }
-    
-    logging.info(f"Strategy Generated: {advice[:50]}...")
+
+def log_strategy(data, artifact):
+    """
+    Archives a served strategy under its project and report period (top-level fields of the alert or
+    prompt item, else its details; the current month if the sender gave none). Never fails the request.
+    """
+    if strategy_log is None or "error" in artifact: return
+    details = data.get("details") or {}
+    project = alert_project(data) or details.get("project_id") or "UNKNOWN"
+    period = data.get("period") or details.get("period") or datetime.now().strftime("%Y-%m")
+    try:
+        with stage_metrics.span("strategy_log"):
+            strategy_log.append(project, period, artifact["content"], artifact["input_cpi"])
+    except Exception as e:
+        logging.warning(f"Strategy log append failed: {e}")
+        stage_metrics.inc("errors_total", stage="strategy_log")
+
+@app.route("/", methods=["POST"])
+def strategize():
+    """
+    Receives a Risk Alert and generates a Recovery Plan.
+    """
+    data = request.json
+    logging.info(f"Strategist received alert: {data}")
+    refresh_schedules()
+    with stage_metrics.span("prompt_build"): cpi, prompt = build_prompt(data)
+
+    # 3. Reasoning (The "Thinking" step)
+    cache_hit = coalesced = False
+    if get_model() is not None:
+        # The rendered prompt is the normalized form of the payload: it keys both the cache and in-flight calls
+        cache_key = StrategyCache.make_key(prompt, MODEL_NAME)
+        advice = cached_advice(cache_key)
+        cache_hit = advice is not None
+        if not cache_hit:
+            advice, coalesced = inflight.do(cache_key, lambda: generate(prompt, cache_key),
+                                            recheck=lambda: strategy_cache.get(cache_key))
+    else:
+        advice = "[MOCK] Vertex AI disabled. Strategy: Cut costs on non-critical tasks."
+
+    # 4. Return the Artifact
+    logging.info(f"Strategy {'Served from cache' if cache_hit else 'Coalesced' if coalesced else 'Generated'}: {advice[:50]}...")
+    artifact = make_artifact(cpi, advice, cache_hit, coalesced)
+    log_strategy(data, artifact)
     return jsonify(artifact)
 
+@app.route("/stream", methods=["POST"])
+def strategize_stream():
+    """
+    Streaming variant of strategize(). Responds with chunked JSON lines (application/x-ndjson):
+    {"type": "chunk", "content": ...} for every model chunk as it arrives, then ONE
+    {"type": "done", ...artifact} (or {"type": "error", "error": ...}) line.
+    """
+    data = request.json
+    logging.info(f"Strategist received alert (stream): {data}")
+    refresh_schedules()
+    with stage_metrics.span("prompt_build"): cpi, prompt = build_prompt(data)
+
+    def line(obj):
+        return json.dumps(obj) + "\n"
+
+    def stream_as_leader(cache_key, call):
+        # Followers (streaming or not) get the finished text; a dropped stream fails them too
+        advice = None
+        start = time.perf_counter()
+        try:
+            parts = []
+            usage = None
+            with stage_metrics.span("llm"):
+                for chunk in get_model().generate_content(prompt, stream=True):
+                    usage = getattr(chunk, "usage_metadata", None) or usage
+                    text = chunk.text
+                    if not text: continue
+                    if not parts: stage_metrics.registry.observe("llm_first_chunk_seconds", time.perf_counter() - start)
+                    parts.append(text)
+                    yield line({"type": "chunk", "content": text})
+            record_usage(usage)
+            advice = "".join(parts)
+            strategy_cache.put(cache_key, MODEL_NAME, advice)
+        finally:
+            error = None if advice is not None else RuntimeError("Leading stream ended before completion")
+            inflight.finish(cache_key, call, result=advice, error=error)
+
+    def events():
+        cache_hit = coalesced = False
+        try:
+            if get_model() is not None:
+                cache_key = StrategyCache.make_key(prompt, MODEL_NAME)
+                advice = cached_advice(cache_key)
+                cache_hit = advice is not None
+                if cache_hit:
+                    yield line({"type": "chunk", "content": advice})
+                else:
+                    call, leader = inflight.begin(cache_key, recheck=lambda: strategy_cache.get(cache_key))
+                    if leader:
+                        yield from stream_as_leader(cache_key, call)
+                        advice = call.result
+                    else:
+                        advice, coalesced = call.wait(), True
+                        yield line({"type": "chunk", "content": advice})
+            else:
+                advice = "[MOCK] Vertex AI disabled. Strategy: Cut costs on non-critical tasks."
+                yield line({"type": "chunk", "content": advice})
+        except Exception as e:
+            # Headers are already sent, so the failure travels in-band
+            logging.error(f"Streaming generation failed: {e}")
+            stage_metrics.inc("errors_total", stage="stream")
+            yield line({"type": "error", "error": str(e)})
+            return
+
+        logging.info(f"Strategy {'Served from cache' if cache_hit else 'Coalesced' if coalesced else 'Streamed'}: {advice[:50]}...")
+        artifact = make_artifact(cpi, advice, cache_hit, coalesced)
+        log_strategy(data, artifact)
+        yield line(dict(artifact, type="done"))
+
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
+@app.route("/batch", methods=["POST"])
+def strategize_batch():
+    """
+    Many alerts in one request. Body: a JSON list (or {"items": [...]}) of Risk Alerts, or of
+    {"prompt": "...", "details": {...}} items carrying a ready prompt. Responds with one JSON array
+    in the original order: the strategize() artifact per item, or {"error": ...} for an item that failed.
+    Cache hits and duplicates (within the batch or in flight elsewhere) cost no model call; the rest run
+    on a pool of BATCH_CONCURRENCY workers, and with BATCH_PACK_SIZE > 1 small prompts are packed
+    several to a generation.
+    """
+    data = request.json
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return jsonify({"error": "Expected a JSON list of alerts (or {\"items\": [...]})"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Batch too large: {len(items)} items (max {BATCH_MAX_ITEMS})"}), 413
+    logging.info(f"Strategist received batch of {len(items)} alerts")
+    stage_metrics.inc("batch_items_total", len(items))
+    refresh_schedules() # Once for the whole batch, not per item
+
+    results = [None] * len(items)
+    cpis = [0.0] * len(items)
+    leaders = []   # (index, prompt, cache_key, call)
+    followers = [] # (index, call)
+    with stage_metrics.span("prompt_build"):
+        for i, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[i] = {"error": "Each item must be a JSON object"}
+                continue
+            try:
+                if item.get("prompt"): cpis[i], prompt = item.get("details", {}).get("current_value", 0.0), str(item["prompt"])
+                else: cpis[i], prompt = build_prompt(item)
+            except Exception as e:
+                results[i] = {"error": f"Bad alert: {e}"}
+                continue
+            if get_model() is None:
+                results[i] = make_artifact(cpis[i], "[MOCK] Vertex AI disabled. Strategy: Cut costs on non-critical tasks.", False)
+                continue
+            cache_key = StrategyCache.make_key(prompt, MODEL_NAME)
+            advice = cached_advice(cache_key)
+            if advice is not None:
+                results[i] = make_artifact(cpis[i], advice, True)
+                continue
+            call, leader = inflight.begin(cache_key, recheck=lambda: strategy_cache.get(cache_key))
+            if leader: leaders.append((i, prompt, cache_key, call))
+            else: followers.append((i, call))
+
+    # Every leader call is finished by its job (result or error), so no follower can hang
+    def run(jobs):
+        try:
+            prompts = [p for _, p, _, _ in jobs]
+            keys = [k for _, _, k, _ in jobs]
+            answers = generate_packed(prompts, keys) if len(jobs) > 1 else [generate(prompts[0], keys[0])]
+            for (_, _, key, call), advice in zip(jobs, answers): inflight.finish(key, call, result=advice)
+        except Exception as e:
+            for _, _, key, call in jobs:
+                if not call.done.is_set(): inflight.finish(key, call, error=e)
+
+    size = max(1, BATCH_PACK_SIZE)
+    packable = [j for j in leaders if size > 1 and len(j[1]) <= BATCH_PACK_MAX_CHARS]
+    singles = [[j] for j in leaders if not (size > 1 and len(j[1]) <= BATCH_PACK_MAX_CHARS)]
+    jobs = [packable[k:k + size] for k in range(0, len(packable), size)] + singles
+    packed = {j[0] for job in jobs if len(job) > 1 for j in job}
+    with stage_metrics.span("batch_generate"):
+        for job in jobs: batch_pool.submit(run, job)
+        for i, _, _, call in leaders:
+            try: results[i] = dict(make_artifact(cpis[i], call.wait(), False), packed=i in packed)
+            except Exception as e: results[i] = {"error": str(e)}
+        for i, call in followers:
+            try: results[i] = make_artifact(cpis[i], call.wait(), False, coalesced=True)
+            except Exception as e: results[i] = {"error": str(e)}
+
+    for item, result in zip(items, results):
+        if isinstance(item, dict): log_strategy(item, result)
+    failed = sum(1 for r in results if "error" in r)
+    if failed: stage_metrics.inc("errors_total", failed, stage="batch")
+    logging.info(f"Batch done: {len(items)} items, {len(leaders)} generated in {len(jobs)} calls, "
+                 f"{len(followers)} coalesced, {failed} failed")
+    return jsonify(results)
+
+@app.route("/warmup", methods=["GET"])
+def warmup():
+    """Startup probe / warm-up hook: initializes everything the first alert would otherwise wait for."""
+    prewarm()
+    return jsonify({"ai_enabled": AI_ENABLED, "schedules": len(schedules.schedules)})
+
+@app.route("/history", methods=["GET"])
+def history():
+    """
+    Archived strategies of one project: ?project_id=...&n=5 (newest first, optionally &period=YYYY-MM),
+    or a period range with &from=YYYY-MM&to=YYYY-MM (oldest first).
+    """
+    if strategy_log is None: return jsonify({"error": "Strategy log disabled (STRATEGY_LOG_DIR)"}), 404
+    project_id = request.args.get("project_id")
+    if not project_id: return jsonify({"error": "project_id is required"}), 400
+    try:
+        if request.args.get("from") or request.args.get("to"):
+            entries = strategy_log.range(project_id, request.args.get("from"), request.args.get("to"))
+        else:
+            entries = strategy_log.last(project_id, int(request.args.get("n", 5)), request.args.get("period"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify([e.to_dict() for e in entries])
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """In-flight coalescing counters: 'coalesced' is the number of model calls saved."""
+    return jsonify({"singleflight": inflight.stats()})
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text format: stage latency histograms, token counts, cache hits, errors."""
+    for name, value in inflight.stats().items(): stage_metrics.set_gauge(f"singleflight_{name}", value)
+    return Response(stage_metrics.registry.render_prometheus(), content_type=stage_metrics.CONTENT_TYPE)
+
+if PREWARM:
+    threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=8081)
\ No newline at end of file
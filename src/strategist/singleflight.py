@@ -0,0 +1,77 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None: raise self.error
+        return self.result
+
+class SingleFlight:
+    """
+    Collapses identical concurrent work into one in-flight call.
+    The first caller for a key (the leader) runs it; callers arriving while it runs
+    wait and receive the same result (or the same exception). Nothing is kept after completion.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    def begin(self, key, recheck=None):
+        """
+        Returns (call, is_leader). The leader MUST call finish(); followers call call.wait().
+        recheck() runs for a would-be leader: the previous leader may have finished (and stored its
+        result) between the caller's own lookup and begin(). A non-None value finishes the call with it.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                return call, False
+            call = self.calls[key] = _Call()
+            self.leaders += 1
+        try: result = recheck() if recheck is not None else None
+        except Exception as e:
+            self.finish(key, call, error=e) # Never leave followers waiting on a call nobody leads
+            raise
+        if result is None: return call, True
+        with self.lock:
+            self.leaders -= 1
+            self.coalesced += 1
+        self.finish(key, call, result=result)
+        return call, False
+
+    def finish(self, key, call, result=None, error=None):
+        with self.lock:
+            if self.calls.get(key) is call: del self.calls[key]
+        call.result, call.error = result, error
+        call.done.set()
+
+    def do(self, key, fn, recheck=None):
+        """Runs fn() once per in-flight key. Returns (result, shared)."""
+        call, leader = self.begin(key, recheck)
+        if not leader: return call.wait(), True
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "leaders": self.leaders, "coalesced": self.coalesced,
+                "in_flight": len(self.calls), "max_waiters": self.max_waiters
+            }
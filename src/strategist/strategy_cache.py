@@ -0,0 +1,81 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Configuration
+CACHE_PATH = os.environ.get("STRATEGY_CACHE_PATH", "strategy_cache.sqlite3")  # "" disables the disk tier
+CACHE_TTL = float(os.environ.get("STRATEGY_CACHE_TTL", 6 * 3600))
+CACHE_MEMORY_ITEMS = int(os.environ.get("STRATEGY_CACHE_MEMORY_ITEMS", 256))
+
+class StrategyCache:
+    """
+    Content-addressed cache of generated strategies.
+    Key = sha256(model name + rendered prompt). Two tiers: an in-memory LRU in front of
+    a SQLite table that survives restarts. Entries older than the TTL are never served.
+    """
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL, max_memory_items=CACHE_MEMORY_ITEMS):
+        self.ttl = ttl_seconds
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.puts = 0
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS strategy_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT, created_at REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS idx_strategy_cache_created ON strategy_cache(created_at)")
+            self.db.commit()
+
+    @staticmethod
+    def make_key(prompt, model_name):
+        return hashlib.sha256(f"{model_name}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _fresh(self, created_at):
+        return time.time() - created_at < self.ttl
+
+    def get(self, key):
+        """Returns the cached content or None."""
+        with self.lock:
+            hit = self.memory.get(key)
+            if hit:
+                if self._fresh(hit[1]):
+                    self.memory.move_to_end(key)
+                    return hit[0]
+                del self.memory[key]
+
+            if self.db is None: return None
+            row = self.db.execute(
+                "SELECT content, created_at FROM strategy_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if not row or not self._fresh(row[1]): return None
+
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, key, model_name, content):
+        now = time.time()
+        with self.lock:
+            self._remember(key, content, now)
+            if self.db is None: return
+            self.db.execute(
+                "INSERT OR REPLACE INTO strategy_cache (key, model, content, created_at) VALUES (?, ?, ?, ?)",
+                (key, model_name, content, now)
+            )
+            self.puts += 1
+            # Amortized TTL eviction instead of a background thread
+            if self.puts % 100 == 0:
+                self.db.execute("DELETE FROM strategy_cache WHERE created_at < ?", (now - self.ttl,))
+            self.db.commit()
+
+    def _remember(self, key, content, created_at):
+        self.memory[key] = (content, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
@@ -0,0 +1,178 @@
+import os
+import time
+import bisect
+import threading
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds): from a cache hit to a slow generation
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR = int(os.environ.get("METRICS_RESERVOIR", 2048)) # Recent samples kept per series for p50/p95/p99
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs: return ""
+    body = ",".join(f'{k}="{str(v)}"'.replace("\n", " ") for k, v in pairs)
+    return "{" + body + "}"
+
+class Histogram:
+    """Cumulative Prometheus buckets plus a bounded window of recent samples for exact-ish quantiles."""
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RESERVOIR)
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts): self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantile(self, q):
+        if not self.recent: return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class MetricsRegistry:
+    """
+    Process-wide, thread-safe stage timings and counters.
+    `with span("llm"):` times a stage (failures are counted per stage);
+    render_prometheus() is the text served on /metrics, summary() feeds per-run tables.
+    """
+    def __init__(self, namespace="pm"):
+        self.namespace = namespace
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, value, **labels):
+        with self.lock:
+            key = (name, _labels(labels))
+            h = self.histograms.get(key)
+            if h is None: h = self.histograms[key] = Histogram()
+            h.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        with self.lock:
+            key = (name, _labels(labels))
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    @contextmanager
+    def span(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("stage_errors_total", stage=stage, **labels)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def summary(self, name="stage_seconds"):
+        """{stage: {count, total_s, p50_s, p95_s, p99_s, errors}} for the stage histograms."""
+        with self.lock:
+            out = {}
+            for (n, labels), h in self.histograms.items():
+                if n != name: continue
+                # Other labels qualify the row, e.g. sheets_read:Budget_Tracking
+                stage = ":".join([dict(labels).get("stage", "")] + [str(v) for k, v in labels if k != "stage"])
+                errors = self.counters.get(("stage_errors_total", labels), 0)
+                out[stage] = {
+                    "count": h.count, "total_s": h.sum, "errors": errors,
+                    **{f"p{int(q * 100)}_s": h.quantile(q) for q in QUANTILES}
+                }
+            return out
+
+    def render_prometheus(self):
+        ns = self.namespace
+        lines = []
+        with self.lock:
+            by_name = {}
+            for (name, labels), h in sorted(self.histograms.items()):
+                by_name.setdefault(name, []).append((labels, h))
+            for name, series in by_name.items():
+                full = f"{ns}_{name}"
+                lines.append(f"# TYPE {full} histogram")
+                for labels, h in series:
+                    running = 0
+                    for le, c in zip(h.buckets, h.counts):
+                        running += c
+                        lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', le)])} {running}")
+                    lines.append(f"{full}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {h.count}")
+                    lines.append(f"{full}_sum{_fmt_labels(labels)} {h.sum}")
+                    lines.append(f"{full}_count{_fmt_labels(labels)} {h.count}")
+                # Pre-computed percentiles over the recent window, for dashboards without histogram_quantile
+                lines.append(f"# TYPE {full}_recent gauge")
+                for labels, h in series:
+                    for q in QUANTILES:
+                        lines.append(f"{full}_recent{_fmt_labels(labels, [('quantile', q)])} {h.quantile(q)}")
+
+            for kind, items in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(items.items()):
+                    full = f"{ns}_{name}"
+                    if full not in typed:
+                        lines.append(f"# TYPE {full} {kind}")
+                        typed.add(full)
+                    lines.append(f"{full}{_fmt_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+def span(stage, **labels):
+    return registry.span(stage, **labels)
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+def set_gauge(name, value, **labels):
+    registry.set(name, value, **labels)
+
+def print_summary(title="Stage timings", reg=None):
+    """Per-run table: one line per stage with count, total and p50/p95/p99 latency."""
+    stats = (reg or registry).summary()
+    if not stats: return
+    print(f"\n⏱️  {title}")
+    print(f"   {'stage':<16}{'count':>7}{'errors':>8}{'total s':>10}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}")
+    for stage, s in sorted(stats.items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"   {stage:<16}{s['count']:>7}{s['errors']:>8g}{s['total_s']:>10.2f}"
+              f"{s['p50_s']:>9.3f}{s['p95_s']:>9.3f}{s['p99_s']:>9.3f}")
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404); self.end_headers(); return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass # Scrapes every few seconds would flood the logs
+
+_server = None
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serves /metrics from a daemon thread (for services whose framework owns the main port)."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
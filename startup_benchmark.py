@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import data_store
+from benchmark import compare
+from synthetic_portfolio import SyntheticPortfolio
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVICES = ("sentinel", "strategist")
+STAGES = ("import", "prewarm_wait", "first_response", "warm_response")
+
+# Runs inside a fresh interpreter, so every number is a cold start
+PROBE = r"""
+import os, sys, time, json, types, threading, importlib.util
+root, service = sys.argv[1], sys.argv[2]
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "src", service))
+t = time.perf_counter()
+spec = importlib.util.spec_from_file_location(service + "_main", os.path.join(root, "src", service, "main.py"))
+svc = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(svc)
+out = {"import": time.perf_counter() - t}
+
+# With PREWARM=1 the service warms up in the background: wait for it, as a startup probe would
+t = time.perf_counter()
+for th in threading.enumerate():
+    if th.name == "prewarm": th.join()
+out["prewarm_wait"] = time.perf_counter() - t
+
+if service == "strategist":
+    client = svc.app.test_client()
+    def respond(n):
+        model = svc.get_model()
+        if model is not None: # Only the network call is stubbed: SDK import and client setup are timed
+            model.generate_content = lambda prompt, **kw: types.SimpleNamespace(text="ok", usage_metadata=None)
+        r = client.post("/", json={"project_id": "PROJ-00001", "details": {"current_value": 0.8 + n / 100}})
+        if r.status_code != 200: raise SystemExit(f"HTTP {r.status_code}")
+else:
+    def respond(n):
+        svc.analyze_event({"id": f"startup-{n}"})
+
+for n, name in enumerate(("first_response", "warm_response")):
+    t = time.perf_counter()
+    respond(n)
+    out[name] = time.perf_counter() - t
+print(json.dumps(out))
+"""
+
+def slowest_imports(stderr, top=5):
+    """Top-level modules by cumulative import time, from python -X importtime output."""
+    found = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:].rstrip() # Nested imports are indented further
+        if not name.startswith(" "): found.append((int(cumulative) / 1e6, name))
+    return sorted(found, reverse=True)[:top]
+
+def run_probe(service, env, cwd, importtime=False):
+    cmd = [sys.executable, "-W", "ignore"] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE, ROOT, service]
+    proc = subprocess.run(cmd, env=env, cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{service} probe failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, (slowest_imports(proc.stderr) if importtime else [])
+
+def bench_service(service, workdir, store_path, runs, prewarm):
+    env = dict(os.environ, MC_DATA_STORE="sqlite", MC_SQLITE_PATH=store_path, METRICS_PORT="0",
+               STRATEGY_CACHE_PATH="", CPI_THRESHOLD="0", PREWARM="1" if prewarm else "0",
+               PYTHONPATH=os.pathsep.join([ROOT, os.environ.get("PYTHONPATH", "")]))
+    samples = []
+    imports = []
+    for run in range(runs):
+        result, top = run_probe(service, env, workdir, importtime=(run == 0))
+        samples.append(result)
+        imports = imports or top
+    stages = {s: {"seconds": statistics.median(r[s] for r in samples), "peak_mb": 0.0} for s in STAGES}
+    cold = stages["import"]["seconds"] + stages["prewarm_wait"]["seconds"] + stages["first_response"]["seconds"]
+    stages["cold_total"] = {"seconds": cold, "peak_mb": 0.0}
+    return {"scale": service + ("+prewarm" if prewarm else ""), "runs": runs, "stages": stages,
+            "slowest_imports": imports}
+
+def print_report(results):
+    for r in results:
+        print(f"\n🚦 {r['scale']}  (median of {r['runs']} cold starts)")
+        for stage, s in r["stages"].items(): print(f"   {stage:<16}{s['seconds']:>10.3f}s")
+        if r["slowest_imports"]:
+            print("   slowest imports: " + ", ".join(f"{name} {sec:.3f}s" for sec, name in r["slowest_imports"]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: import time and time to first response per service.")
+    parser.add_argument("--services", default=",".join(SERVICES), help="Comma-separated: sentinel,strategist")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per service (median is reported)")
+    parser.add_argument("--prewarm", action="store_true", help="Also measure each service with PREWARM=1")
+    parser.add_argument("--save", help="Write results as JSON (use as a later --baseline)")
+    parser.add_argument("--baseline", help="Previous --save output; exit 1 if any stage regressed")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # Offline store: the Sentinel scans it and the Strategist reads its Schedule_Gantt tab
+        store_path = os.path.join(workdir, "startup.sqlite3")
+        SyntheticPortfolio(50, 3, 5, seed=7).seed_store(data_store.SQLiteStore(store_path))
+        for service in args.services.split(","):
+            for prewarm in ((False, True) if args.prewarm else (False,)):
+                print(f"⏱️  Cold-starting {service}{' (PREWARM=1)' if prewarm else ''} x{args.runs}...")
+                results.append(bench_service(service, workdir, store_path, args.runs, prewarm))
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w") as f: json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f: slower = compare(results, json.load(f), args.tolerance)
+        if slower:
+            print(f"\n❌ {len(slower)} stage(s) regressed beyond {args.tolerance:.0%}:")
+            for scale, stage, old_s, new_s in slower: print(f"   - {scale} {stage}: {old_s:.4f}s -> {new_s:.4f}s")
+            return 1
+        print("\n✅ No regressions against baseline.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
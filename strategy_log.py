@@ -0,0 +1,347 @@
+import os
+import csv
+import sys
+import json
+import mmap
+import time
+import zlib
+import heapq
+import bisect
+import struct
+import hashlib
+import argparse
+import threading
+
+# CONFIG
+LOG_DIR = os.environ.get("STRATEGY_LOG_DIR", "strategy_log")
+SEGMENT_BYTES = int(os.environ.get("STRATEGY_LOG_SEGMENT_BYTES", 4 * 2**20)) # Rotate after this much compressed data
+COMPRESS_LEVEL = 6
+
+# Fixed-size binary header per entry: project, period, timestamp, body offset, body length, CPI
+HEADER = struct.Struct("<32s12sdQId")
+PROJECT_BYTES, PERIOD_BYTES = 32, 12
+
+def _pad(text, size, field):
+    raw = str(text or "").encode("utf-8")
+    if len(raw) > size: raise ValueError(f"{field} longer than {size} bytes: {text!r}")
+    return raw.ljust(size, b"\0")
+
+def _unpad(raw):
+    return raw.rstrip(b"\0").decode("utf-8")
+
+class LogEntry:
+    """One logged strategy. The header fields come from the index; the body is decompressed on access."""
+    __slots__ = ("project_id", "period", "ts", "cpi", "_segment", "_offset", "_length")
+
+    def __init__(self, segment, record):
+        project, period, ts, offset, length, cpi = record
+        self.project_id, self.period, self.ts, self.cpi = _unpad(project), _unpad(period), ts, cpi
+        self._segment, self._offset, self._length = segment, offset, length
+
+    @property
+    def strategy(self):
+        return self._segment.body(self._offset, self._length)
+
+    def to_dict(self):
+        return {"project_id": self.project_id, "period": self.period, "timestamp": self.ts,
+                "cpi": self.cpi, "strategy": self.strategy}
+
+class _IndexView:
+    """Sequence of (project, period, ts) keys over a sorted, memory-mapped index, for bisect."""
+    def __init__(self, mm):
+        self.mm = mm
+
+    def __len__(self):
+        return len(self.mm) // HEADER.size
+
+    def __getitem__(self, i):
+        return HEADER.unpack_from(self.mm, i * HEADER.size)[:3]
+
+    def record(self, i):
+        return HEADER.unpack_from(self.mm, i * HEADER.size)
+
+class _Segment:
+    """
+    seg-NNNNNN.dat holds the compressed bodies back to back. While the segment is active its headers
+    are appended to .idx (arrival order) and also kept in memory, and bodies are read with os.pread;
+    sealing sorts the headers by (project, period, ts) into .sidx. A sealed segment's files are
+    memory-mapped once and stay mapped until close(), so readers never see a mapping go away.
+    """
+    def __init__(self, directory, seq):
+        self.seq = seq
+        base = os.path.join(directory, f"seg-{seq:06d}")
+        self.data_path, self.index_path, self.sorted_path = base + ".dat", base + ".idx", base + ".sidx"
+        self.lock = threading.Lock()
+        self._data_mm = None
+        self._index_mm = None
+        self._read_fd = None # Active segment reads; kept open until close() even after sealing
+        self.records = []
+        self.by_project = {} # Active segment only: project -> its headers, so lookups skip other projects
+        self.data_file = self.index_file = None
+
+        if os.path.exists(self.sorted_path):
+            if os.path.exists(self.index_path): os.remove(self.index_path) # Crash after sealing
+            self.sealed = True
+            return
+        self.sealed = False
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f: raw = f.read()
+            data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+            for i in range(len(raw) // HEADER.size): # A torn trailing header is dropped
+                rec = HEADER.unpack_from(raw, i * HEADER.size)
+                if rec[3] + rec[4] > data_size: break # Body never fully written
+                self.records.append(rec)
+                self.by_project.setdefault(rec[0], []).append(rec)
+        end = max((r[3] + r[4] for r in self.records), default=0)
+        self.data_file = open(self.data_path, "ab")
+        self.data_file.truncate(end)
+        self.index_file = open(self.index_path, "ab")
+        self.index_file.truncate(len(self.records) * HEADER.size)
+
+    @property
+    def data_size(self):
+        return self.data_file.tell() if self.data_file else os.path.getsize(self.data_path)
+
+    def append(self, project, period, ts, cpi, strategy):
+        body = zlib.compress(strategy.encode("utf-8"), COMPRESS_LEVEL)
+        with self.lock:
+            offset = self.data_file.tell()
+            self.data_file.write(body)
+            self.data_file.flush()
+            rec = (project, period, ts, offset, len(body), cpi)
+            self.index_file.write(HEADER.pack(*rec))
+            self.index_file.flush()
+            self.records.append(rec)
+            self.by_project.setdefault(project, []).append(rec)
+        return rec
+
+    def seal(self):
+        """Sorts the headers into .sidx (atomically) and closes the write handles."""
+        with self.lock:
+            for f in (self.data_file, self.index_file):
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+            self.data_file = self.index_file = None
+            tmp = self.sorted_path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(b"".join(HEADER.pack(*r) for r in sorted(self.records, key=lambda r: r[:3])))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.sorted_path)
+            os.remove(self.index_path)
+            self.records, self.by_project, self.sealed = [], {}, True
+
+    @staticmethod
+    def _map(path):
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(path) else b""
+
+    def _index(self):
+        with self.lock:
+            if self._index_mm is None: self._index_mm = self._map(self.sorted_path)
+            return _IndexView(self._index_mm)
+
+    def body(self, offset, length):
+        with self.lock:
+            if self.sealed and self._data_mm is None: self._data_mm = self._map(self.data_path)
+            if self._data_mm is None and self._read_fd is None: self._read_fd = os.open(self.data_path, os.O_RDONLY)
+            mm, fd = self._data_mm, self._read_fd
+        raw = mm[offset:offset + length] if mm is not None else os.pread(fd, length, offset)
+        return zlib.decompress(raw).decode("utf-8")
+
+    def find(self, project, period_lo, period_hi):
+        """Headers of one project with period_lo <= period <= period_hi, sorted by (period, ts)."""
+        with self.lock: active = None if self.sealed else list(self.by_project.get(project, ()))
+        if active is not None:
+            return sorted((r for r in active if period_lo <= r[1] <= period_hi), key=lambda r: r[:3])
+        view = self._index()
+        lo = bisect.bisect_left(view, (project, period_lo, float("-inf")))
+        hi = bisect.bisect_right(view, (project, period_hi, float("inf")), lo)
+        return [view.record(i) for i in range(lo, hi)]
+
+    def ts_bounds(self):
+        with self.lock: stamps = None if self.sealed else [r[2] for r in self.records]
+        if stamps is None:
+            view = self._index()
+            stamps = [view[i][2] for i in range(len(view))]
+        return (min(stamps), max(stamps)) if stamps else (None, None)
+
+    def count(self):
+        with self.lock: active = None if self.sealed else len(self.records)
+        return active if active is not None else len(self._index())
+
+    def close(self):
+        with self.lock:
+            for f in (self.data_file, self.index_file):
+                if f: f.flush(); os.fsync(f.fileno()); f.close()
+            self.data_file = self.index_file = None
+            for mm in (self._data_mm, self._index_mm):
+                if mm is not None and hasattr(mm, "close"): mm.close()
+            if self._read_fd is not None: os.close(self._read_fd)
+            self._data_mm = self._index_mm = self._read_fd = None
+
+class StrategyLog:
+    """
+    Append-only strategy log replacing mission_log.csv.
+    Entries are indexed by a fixed-size binary header on (project, period, timestamp); strategy bodies
+    are zlib-compressed and only decompressed when read. Segments rotate at STRATEGY_LOG_SEGMENT_BYTES
+    and are sealed into a sorted, memory-mapped index, so range and last-N queries binary-search each
+    segment instead of parsing the whole history.
+    """
+    def __init__(self, directory=LOG_DIR, segment_bytes=SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.meta = {"bounds": {}, "migrated": {}}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f: self.meta.update(json.load(f))
+
+        seqs = sorted({int(n[4:10]) for n in os.listdir(directory) if n.startswith("seg-") and n[4:10].isdigit()})
+        self.segments = [_Segment(directory, s) for s in seqs]
+        if not self.segments or self.segments[-1].sealed:
+            self.segments.append(_Segment(directory, (seqs[-1] + 1) if seqs else 1))
+        for seg in self.segments[:-1]:
+            if not seg.sealed: self._seal(seg) # Left active by a crash mid-rotation
+
+    def _save_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def _seal(self, seg):
+        seg.seal()
+        self.meta["bounds"][str(seg.seq)] = list(seg.ts_bounds())
+        self._save_meta()
+
+    def append(self, project_id, period, strategy, cpi=0.0, ts=None):
+        """Logs one strategy. Returns its timestamp."""
+        ts = time.time() if ts is None else float(ts)
+        project = _pad(project_id, PROJECT_BYTES, "Project ID")
+        period_key = _pad(period, PERIOD_BYTES, "Period")
+        with self.lock:
+            active = self.segments[-1]
+            if active.data_size >= self.segment_bytes:
+                self._seal(active)
+                active = _Segment(self.directory, active.seq + 1)
+                self.segments.append(active)
+            active.append(project, period_key, ts, float(cpi or 0.0), strategy or "")
+        return ts
+
+    def range(self, project_id, period_from=None, period_to=None, since=None, until=None):
+        """Entries of one project between two periods (inclusive) and/or timestamps, by (period, ts)."""
+        project = _pad(project_id, PROJECT_BYTES, "Project ID")
+        lo = _pad(period_from, PERIOD_BYTES, "Period") if period_from else b""
+        hi = _pad(period_to, PERIOD_BYTES, "Period") if period_to else b"\xff" * PERIOD_BYTES
+        with self.lock: segments = list(self.segments)
+        per_segment = []
+        for seg in segments:
+            if not self._overlaps(seg, since, until): continue
+            found = [LogEntry(seg, r) for r in seg.find(project, lo, hi)
+                     if (since is None or r[2] >= since) and (until is None or r[2] <= until)]
+            if found: per_segment.append(found)
+        return list(heapq.merge(*per_segment, key=lambda e: (e.period, e.ts)))
+
+    def last(self, project_id, n=1, period=None):
+        """The n most recent entries of one project (optionally one period), newest first."""
+        project = _pad(project_id, PROJECT_BYTES, "Project ID")
+        lo = _pad(period, PERIOD_BYTES, "Period") if period else b""
+        hi = lo if period else b"\xff" * PERIOD_BYTES
+        with self.lock: segments = list(self.segments)
+        best = [] # min-heap of (ts, seq, record) holding the n newest so far
+        for seg in reversed(segments):
+            bounds = self.meta["bounds"].get(str(seg.seq))
+            # Segments are written in time order: stop once a whole segment is older than the n-th newest
+            if len(best) >= n and bounds and bounds[1] is not None and bounds[1] < best[0][0]: break
+            for r in seg.find(project, lo, hi):
+                item = (r[2], seg.seq, r)
+                if len(best) < n: heapq.heappush(best, item)
+                elif item > best[0]: heapq.heapreplace(best, item)
+        by_seq = {s.seq: s for s in segments}
+        return [LogEntry(by_seq[seq], r) for _, seq, r in sorted(best, reverse=True)]
+
+    def _overlaps(self, seg, since, until):
+        bounds = self.meta["bounds"].get(str(seg.seq))
+        if not bounds or bounds[0] is None: return True
+        return (since is None or bounds[1] >= since) and (until is None or bounds[0] <= until)
+
+    def stats(self):
+        with self.lock: segments = list(self.segments)
+        data = sum(os.path.getsize(s.data_path) for s in segments if os.path.exists(s.data_path))
+        return {"segments": len(segments), "entries": sum(s.count() for s in segments), "data_bytes": data}
+
+    def migrate_csv(self, path, project_id="LEGACY", period=""):
+        """
+        One-time import of a mission_log.csv (Timestamp, CPI_Value, AI_Strategy_Summary).
+        Blank timestamps get the file's mtime, spaced by row so the original order survives.
+        A file already imported (same content hash) is skipped. Returns the number of entries added.
+        """
+        with open(path, "rb") as f: digest = hashlib.sha256(f.read()).hexdigest()
+        if digest in self.meta["migrated"].values(): return 0
+        base_ts = os.path.getmtime(path)
+        added = 0
+        with open(path, newline="", encoding="utf-8") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                ts = _parse_ts(row.get("Timestamp")) or base_ts + i * 1e-3
+                try: cpi = float(row.get("CPI_Value") or 0)
+                except ValueError: cpi = 0.0
+                self.append(project_id, period, row.get("AI_Strategy_Summary", ""), cpi, ts)
+                added += 1
+        with self.lock:
+            self.meta["migrated"][os.path.abspath(path)] = digest
+            self._save_meta()
+        return added
+
+    def close(self):
+        with self.lock:
+            for seg in self.segments: seg.close()
+
+def _parse_ts(text):
+    from datetime import datetime
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try: return datetime.strptime((text or "").strip(), fmt).timestamp()
+        except ValueError: continue
+    return None
+
+def _print_entries(entries, width=100):
+    from datetime import datetime
+    for e in entries:
+        when = datetime.fromtimestamp(e.ts).strftime("%Y-%m-%d %H:%M")
+        text = " ".join(e.strategy.split())
+        print(f"{when}  {e.project_id} {e.period or '-':<8} CPI {e.cpi:<5g} {text[:width]}{'...' if len(text) > width else ''}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Indexed, compressed strategy log (replaces mission_log.csv).")
+    parser.add_argument("--dir", default=LOG_DIR, help="Log directory (STRATEGY_LOG_DIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("migrate", help="One-time import of a mission_log.csv")
+    p.add_argument("csv", nargs="?", default="mission_log.csv")
+    p.add_argument("--project", default="LEGACY", help="Project ID for the imported rows (the CSV has none)")
+    p.add_argument("--period", default="")
+    p = sub.add_parser("last", help="Most recent strategies of a project")
+    p.add_argument("project")
+    p.add_argument("-n", type=int, default=5)
+    p.add_argument("--period")
+    p = sub.add_parser("range", help="Strategies of a project between two periods")
+    p.add_argument("project")
+    p.add_argument("--from", dest="period_from")
+    p.add_argument("--to", dest="period_to")
+    sub.add_parser("stats", help="Segments, entries and on-disk size")
+    args = parser.parse_args(argv)
+
+    log = StrategyLog(args.dir)
+    try:
+        if args.command == "migrate":
+            added = log.migrate_csv(args.csv, args.project, args.period)
+            print(f"✅ Imported {added} entries from {args.csv}." if added else f"⏭️  {args.csv} was already imported.")
+        elif args.command == "last": _print_entries(log.last(args.project, args.n, args.period))
+        elif args.command == "range": _print_entries(log.range(args.project, args.period_from, args.period_to))
+        else: print(json.dumps(log.stats()))
+    finally:
+        log.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import random
+from datetime import date, timedelta
+import data_store
+
+STATUSES = ["Active"] * 9 + ["Closed"]
+TASK_STATUSES = ["Done", "In Progress", "Delayed", "Blocked", "Pending"]
+ACTIONS = [
+    "Overtime frozen on non-critical crews.",
+    "Renegotiated steel supply contract.",
+    "Partial implementation. Overtime reduced but not frozen.",
+    "",  # Missing manager input: triggers the simulation path
+]
+
+def money(x):
+    return f"${x:,.0f}"
+
+def period_label(start_year, start_month, offset):
+    m = start_month - 1 + offset
+    return f"{start_year + m // 12}-{m % 12 + 1:02d}"
+
+def day_label(start_year, day):
+    # Calendar days from Jan 1st (always a valid ISO date, so schedules can be date-diffed)
+    return (date(start_year, 1, 1) + timedelta(days=day)).isoformat()
+
+class SyntheticPortfolio:
+    """
+    Seeded generator of Budget_Tracking / Schedule_Gantt / AI_Analysis_Log rows with the
+    production column layout (data_store.TAB_HEADERS), as strings like get_all_values() returns them.
+    The same seed always yields the same rows.
+    Rows are produced lazily by the iter_* methods, so very large portfolios can be streamed.
+    """
+    def __init__(self, projects=100, periods=12, categories=10, tasks=10, seed=42, start="2024-01"):
+        self.projects = projects
+        self.periods = periods
+        self.categories = categories
+        self.tasks = tasks
+        self.seed = seed
+        self.start_year, self.start_month = (int(x) for x in start.split("-"))
+
+    def project(self, p):
+        rng = random.Random(f"{self.seed}:{p}")
+        return {
+            "id": f"PROJ-{p + 1:05d}",
+            "name": f"Site {p + 1}",
+            "status": rng.choice(STATUSES),
+            "bac": [rng.randint(50, 2000) * 1000 for _ in range(self.categories)],
+            "efficiency": [rng.uniform(0.6, 1.15) for _ in range(self.categories)],
+            "pace": rng.uniform(0.7, 1.1),
+            "rng": rng,
+        }
+
+    def period(self, i):
+        return period_label(self.start_year, self.start_month, i)
+
+    def iter_budget_rows(self):
+        yield list(data_store.TAB_HEADERS["Budget_Tracking"])
+        for p in range(self.projects):
+            proj = self.project(p)
+            rng = proj["rng"]
+            for t in range(self.periods):
+                progress = (t + 1) / (self.periods + 1)
+                tot = [0.0, 0.0, 0.0, 0.0]
+                for c in range(self.categories):
+                    bac = proj["bac"][c]
+                    pv = bac * progress
+                    ev = pv * proj["pace"] * rng.uniform(0.95, 1.05)
+                    ac = ev / (proj["efficiency"][c] * rng.uniform(0.97, 1.03))
+                    for k, v in enumerate((bac, pv, ev, ac)): tot[k] += v
+                    yield [proj["id"], proj["name"], proj["status"], self.period(t), f"{c + 1}.0 Category {c + 1}",
+                           money(bac), money(pv), money(ev), money(ac), f"{ev / ac:.2f}"]
+                yield [proj["id"], proj["name"], proj["status"], self.period(t), "TOTAL PROJECT",
+                       money(tot[0]), money(tot[1]), money(tot[2]), money(tot[3]), f"{tot[2] / tot[3]:.2f}"]
+
+    def iter_gantt_rows(self):
+        """One chain-with-branches task network per project, reported in the latest period."""
+        yield list(data_store.TAB_HEADERS["Schedule_Gantt"])
+        latest = self.period(self.periods - 1)
+        for p in range(self.projects):
+            proj = self.project(p)
+            rng = proj["rng"]
+            finish = {}
+            for k in range(self.tasks):
+                dep = "-" if k == 0 else str(rng.randint(max(1, k - 2), k))
+                start = 0 if dep == "-" else finish[int(dep)] + 1
+                length = rng.randint(5, 60)
+                slip = max(0, int(length * (1 / proj["pace"] - 1)))
+                finish[k + 1] = start + length
+                yield [proj["id"], latest, str(k + 1), f"Task {k + 1}", rng.choice(TASK_STATUSES),
+                       day_label(self.start_year, start), day_label(self.start_year, start + length),
+                       day_label(self.start_year, start), day_label(self.start_year, start + length + slip),
+                       "Yes" if slip else "No", dep]
+
+    def iter_log_rows(self):
+        """History for every period before the latest one, so the learning loop has something to read."""
+        yield list(data_store.TAB_HEADERS["AI_Analysis_Log"])
+        for p in range(self.projects):
+            proj = self.project(p)
+            rng = proj["rng"]
+            for t in range(self.periods - 1):
+                cpi = round(sum(proj["efficiency"]) / self.categories * rng.uniform(0.97, 1.03), 2)
+                yield [f"{self.period(t)}-28 10:00:00", proj["id"], proj["name"], self.period(t), str(cpi),
+                       f"Synthetic strategy for {proj['id']} {self.period(t)}.", rng.choice(ACTIONS)]
+
+    def tabs(self):
+        return {
+            "Budget_Tracking": self.iter_budget_rows,
+            "Schedule_Gantt": self.iter_gantt_rows,
+            "AI_Analysis_Log": self.iter_log_rows,
+        }
+
+    def seed_store(self, store, chunk=50_000):
+        """Writes every tab to a data_store backend (replacing its contents), in chunks."""
+        for title, rows in self.tabs().items():
+            try: w = store.worksheet(title)
+            except Exception: w = store.add_worksheet(title, 100, 20)
+            it = rows()
+            w.update("A1", [next(it)])
+            batch = []
+            for r in it:
+                batch.append(r)
+                if len(batch) >= chunk: w.append_rows(batch); batch = []
+            if batch: w.append_rows(batch)